@@ -1,34 +1,45 @@
 import os
 import glob
+import hashlib
 import zipfile
 import requests
-from io import BytesIO
+import tempfile
 import argparse
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
+import numpy as np
 import pandas as pd
 import geopandas as gpd
+import shapely
+import pyogrio
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from pyarrow import csv as pacsv
 import matplotlib
 matplotlib.use("Agg")
 
 import matplotlib.pyplot as plt
 
-from scipy.stats import trim_mean
-from astral import LocationInfo
-from astral.sun import sun
-import pytz
-import matplotlib
-
 
 # ================== KONFIGURACJA ==================
 
 DANE_METEO_DIR = "dane_meteo"
 OUTPUT_DIR = "wyniki_analizy"
+OUTPUT_FORMAT = "parquet"  # "parquet" lub "csv"
 
 EFFACILITY_PATH = "Dane_administracyjne/effacility.geojson"
 ADMIN_VOIV_PATH = "Dane_administracyjne/woj.shp"
 ADMIN_COUNTY_PATH = "Dane_administracyjne/powiaty.shp"
 
+CSV_COLUMNS = ["KodSH", "ParametrSH", "Data", "Value"]
+PERIODS = ["noc", "dzien"]
+NUMBER_PATTERN = r"^[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$"
+DATE_FORMAT = "%Y-%m-%d %H:%M"  # format kolumny Data w plikach IMGW
+
+DOWNLOAD_SPOOL_SIZE = 64 * 1024 * 1024
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
 TRIM_PROP = 0.1
 CHANGE_FREQ = "7D"
 
@@ -52,6 +63,25 @@ def ensure_dirs():
     os.makedirs(DANE_METEO_DIR, exist_ok=True)
     os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+def save_output(df, name):
+    if OUTPUT_FORMAT == "csv":
+        # Daty w formacie jak z to_csv: same daty, gdy wszystkie wartości są o północy
+        dates = {
+            c: df[c].dt.strftime("%Y-%m-%d" if (df[c].dropna() == df[c].dropna().dt.normalize()).all()
+                                 else "%Y-%m-%d %H:%M:%S")
+            for c in df.columns if pd.api.types.is_datetime64_any_dtype(df[c])
+        }
+        # Zapis CSV w C przez pyarrow zamiast wierszowego to_csv; nagłówek i wartości
+        # bez cudzysłowów jak w to_csv (w wynikach są tylko kody, daty i liczby)
+        with open(os.path.join(OUTPUT_DIR, f"{name}.csv"), "wb") as f:
+            f.write((",".join(map(str, df.columns)) + "\n").encode("utf-8"))
+            pacsv.write_csv(
+                pa.Table.from_pandas(df.assign(**dates), preserve_index=False), f,
+                write_options=pacsv.WriteOptions(include_header=False, quoting_style="none"),
+            )
+    else:
+        df.to_parquet(os.path.join(OUTPUT_DIR, f"{name}.parquet"), engine="pyarrow", compression="zstd", index=False)
+
 # ================== 1. IMGW ==================
 
 def download_imgw_data(year, month):
@@ -69,152 +99,328 @@ def download_imgw_data(year, month):
         f"Arch/Telemetria/Meteo/{year}/Meteo_{year}-{month:02d}.zip"
     )
 
-    r = requests.get(url, timeout=120)
-    r.raise_for_status()
-
-    with zipfile.ZipFile(BytesIO(r.content)) as z:
-        z.extractall(target_dir)
+    # Archiwum strumieniowane do pliku tymczasowego (w RAM tylko do DOWNLOAD_SPOOL_SIZE)
+    with requests.get(url, stream=True, timeout=120) as r, \
+            tempfile.SpooledTemporaryFile(max_size=DOWNLOAD_SPOOL_SIZE) as tmp:
+        r.raise_for_status()
+        for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+            tmp.write(chunk)
+        tmp.seek(0)
+
+        with zipfile.ZipFile(tmp) as z:
+            z.extractall(target_dir)
+
+def download_imgw_months(year, months, max_workers=6):
+    # Pobieranie jest ograniczone opóźnieniem sieci – miesiące pobierane równolegle
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(months)))) as ex:
+        for f in [ex.submit(download_imgw_data, year, m) for m in months]:
+            f.result()
 
 # ================== 2. PANDAS ==================
 
-def read_parameter_csvs(year_months, parameter_code):
-    files = []
-    for ym in year_months:
-        files.extend(glob.glob(os.path.join(DANE_METEO_DIR, ym, "*.csv")))
+def read_imgw_csv(path, codes=None):
+    # Pliki IMGW nie mają nagłówka; wszystkie kolumny czytane jako tekst
+    cols = ["f0", "f1", "f2", "f3"]
+    reader = pacsv.open_csv(
+        path,
+        read_options=pacsv.ReadOptions(autogenerate_column_names=True, block_size=1 << 24),
+        parse_options=pacsv.ParseOptions(delimiter=";", invalid_row_handler=lambda row: "skip"),
+        convert_options=pacsv.ConvertOptions(
+            include_columns=cols,
+            column_types={c: pa.string() for c in cols},
+            strings_can_be_null=True
+        )
+    )
 
+    # Strumieniowo: w pamięci zostają tylko wiersze z szukanymi parametrami
+    batches = []
+    for batch in reader:
+        if codes is not None:
+            batch = batch.filter(pc.is_in(batch.column("f1"), value_set=codes))
+        batches.append(batch)
+
+    return pa.Table.from_batches(batches, schema=reader.schema).rename_columns(CSV_COLUMNS)
+
+def read_month_table(ym, code_set):
+    files = sorted(glob.glob(os.path.join(DANE_METEO_DIR, ym, "*.csv")))
     if not files:
+        return None
+
+    # Podpis z nazw plików, ich mtime i szukanych kodów – zmiana danych unieważnia cache
+    sig_src = "|".join(f"{os.path.basename(f)}:{os.stat(f).st_mtime_ns}" for f in files)
+    sig_src += "|" + ",".join(sorted(code_set.to_pylist()))
+    sig = hashlib.blake2b(sig_src.encode(), digest_size=8).hexdigest()
+    cache_path = os.path.join(DANE_METEO_DIR, ym, f"parsed.{sig}.parquet")
+
+    if os.path.exists(cache_path):
+        return pq.read_table(cache_path, use_threads=True)
+
+    # Każdy plik parsowany raz; pyarrow zwalnia GIL, więc wątki skalują się z rdzeniami
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as ex:
+        table = pa.concat_tables(list(ex.map(lambda f: read_imgw_csv(f, code_set), files)))
+
+    for old in glob.glob(os.path.join(DANE_METEO_DIR, ym, "parsed.*.parquet")):
+        os.remove(old)
+    pq.write_table(table, cache_path, compression="zstd", use_dictionary=True)
+    return table
+
+def parse_decimal_comma(arr):
+    # Tekstowa kolumna Arrow -> float64: przecinek zamieniany na kropkę, niepoprawne wartości -> null
+    arr = pc.replace_substring(pc.utf8_trim_whitespace(arr), ",", ".")
+    valid = pc.match_substring_regex(arr, NUMBER_PATTERN)
+    return pc.cast(pc.if_else(valid, arr, pa.scalar(None, pa.string())), pa.float64())
+
+def table_to_observations(table):
+    if table.num_rows == 0:
         return pd.DataFrame()
 
-    df = pd.concat(
-        (
-            pd.read_csv(
-                f,
-                header=None,
-                delimiter=";",
-                usecols=[0, 1, 2, 3],
-                names=["KodSH", "ParametrSH", "Data", "Value"],
-                dtype=str,
-                on_bad_lines="skip"
-            )
-            for f in files
-        ),
-        ignore_index=True
-    )
+    # Zawsze tekst -> float (bez wykrywania separatora i ponownego parsowania pliku przy błędzie)
+    value = parse_decimal_comma(table["Value"])
+    table = table.set_column(table.schema.get_field_index("Value"), "Value", value)
 
-    df = df[df["ParametrSH"] == parameter_code]
-    if df.empty:
-        return pd.DataFrame()
+    # Data parsowana w Arrow ze stałym formatem (bez zgadywania formatu per wiersz)
+    dt = pc.strptime(pc.utf8_trim_whitespace(table["Data"]), format=DATE_FORMAT, unit="s", error_is_null=True)
+    table = table.append_column("datetime", dt)
 
-    df["Value"] = df["Value"].str.replace(",", ".").astype(float)
-    df["datetime"] = pd.to_datetime(df["Data"], errors="coerce")
+    # Do pandas trafiają tylko używane kolumny; KodSH słownikowo -> od razu Categorical
+    # bez tworzenia obiektu str dla każdego wiersza
+    table = table.set_column(table.schema.get_field_index("KodSH"), "KodSH", pc.dictionary_encode(table["KodSH"]))
+    df = table.select(["KodSH", "datetime", "Value"]).to_pandas()
 
     return df[["KodSH", "datetime", "Value"]].dropna()
 
-# ================== 3. DZIEŃ / NOC ==================
+def read_all_parameters(year_months, codes):
+    codes = list(codes)
+    code_set = pa.array(codes, type=pa.string())
 
-def add_day_night_astral(df, eff):
-    eff = eff.to_crs(4326)
-    eff["KodSH"] = eff.iloc[:, 0].astype(str)
-    df["KodSH"] = df["KodSH"].astype(str)
+    # Miesiąc sparsowany wcześniej wczytywany z Parquet zamiast ponownie z CSV
+    tables = [t for t in (read_month_table(ym, code_set) for ym in year_months) if t is not None]
+    if not tables:
+        return {code: pd.DataFrame() for code in codes}
+    table = pa.concat_tables(tables)
 
-    df = df.merge(eff[["KodSH", "geometry"]], on="KodSH", how="left")
-    tz = pytz.timezone("Europe/Warsaw")
+    # Jedno sortowanie po kodzie parametru, potem wycinki bez kopiowania
+    # zamiast osobnego filtrowania całej tabeli dla każdego parametru
+    table = table.sort_by("ParametrSH")
+    param = table["ParametrSH"].to_numpy(zero_copy_only=False)
 
-    df["date"] = df["datetime"].dt.date
+    out = {}
+    for code in codes:
+        lo, hi = np.searchsorted(param, code, side="left"), np.searchsorted(param, code, side="right")
+        out[code] = table_to_observations(table.slice(lo, hi - lo))
+    return out
 
-    sun_cache = {}
+def read_parameter_csvs(year_months, parameter_code):
+    return read_all_parameters(year_months, [parameter_code])[parameter_code]
 
-    def get_sun_times(kod, geom, d):
-        key = (kod, d)
-        if key in sun_cache:
-            return sun_cache[key]
+# ================== 3. DZIEŃ / NOC ==================
 
-        if geom is None or geom.is_empty:
-            sun_cache[key] = (None, None)
-        else:
-            loc = LocationInfo(latitude=geom.y, longitude=geom.x)
-            s = sun(loc.observer, date=d, tzinfo=tz)
-            sun_cache[key] = (s["sunrise"], s["sunset"])
-        return sun_cache[key]
+# Kąt zenitalny wschodu/zachodu z poprawką na refrakcję (jak w astral)
+SUN_ZENITH = np.deg2rad(90.833)
 
-    for _, r in df[["KodSH", "date", "geometry"]].drop_duplicates().iterrows():
-        get_sun_times(r["KodSH"], r["geometry"], r["date"])
+def solar_day_terms(doy):
+    """Deklinacja [rad] i równanie czasu [min] – zależą wyłącznie od dnia roku"""
+    gamma = 2 * np.pi * (doy - 1) / 365.0
 
-    df["sun_key"] = list(zip(df["KodSH"], df["date"]))
-    sun_df = pd.DataFrame(
-        [{"sun_key": k, "sunrise": v[0], "sunset": v[1]} for k, v in sun_cache.items()]
+    eqtime = 229.18 * (
+        0.000075
+        + 0.001868 * np.cos(gamma) - 0.032077 * np.sin(gamma)
+        - 0.014615 * np.cos(2 * gamma) - 0.040849 * np.sin(2 * gamma)
     )
-
-    df = df.merge(sun_df, on="sun_key", how="left")
-
-    df["dt_local"] = (
-        df["datetime"]
-        .dt.tz_localize("UTC", ambiguous="NaT", nonexistent="NaT")
-        .dt.tz_convert(tz)
+    decl = (
+        0.006918
+        - 0.399912 * np.cos(gamma) + 0.070257 * np.sin(gamma)
+        - 0.006758 * np.cos(2 * gamma) + 0.000907 * np.sin(2 * gamma)
+        - 0.002697 * np.cos(3 * gamma) + 0.00148 * np.sin(3 * gamma)
     )
-
-    df["period"] = "noc"
-    mask = (
-        df["sunrise"].notna()
-        & (df["dt_local"] >= df["sunrise"])
-        & (df["dt_local"] <= df["sunset"])
+    return decl, eqtime
+
+def solar_times_utc(lats, lons, doy):
+    """Wschód i zachód słońca (NOAA) w minutach od północy UTC, wektorowo dla tablic"""
+    # Część zależna od daty liczona raz na unikalny dzień
+    days, inv = np.unique(doy, return_inverse=True)
+    decl, eqtime = solar_day_terms(days)
+    decl, eqtime = decl[inv], eqtime[inv]
+
+    phi = np.deg2rad(lats)
+    cos_ha = np.cos(SUN_ZENITH) / (np.cos(phi) * np.cos(decl)) - np.tan(phi) * np.tan(decl)
+    ha = np.rad2deg(np.arccos(np.clip(cos_ha, -1.0, 1.0)))
+
+    sunrise = 720 - 4 * (lons + ha) - eqtime
+    sunset = 720 - 4 * (lons - ha) - eqtime
+    return sunrise, sunset
+
+def station_coordinates(eff):
+    # Współrzędne WGS84 stacji liczone raz na przebieg (jedna transformacja PROJ);
+    # zaokrąglone do ~100 m – stacje w tym samym miejscu dzielą wynik
+    code_field = find_station_code_field(eff)
+    eff = eff.to_crs(4326)
+    return pd.DataFrame({
+        "KodSH": eff[code_field].astype(str).to_numpy(),
+        "lat": eff.geometry.y.round(3).to_numpy(),
+        "lon": eff.geometry.x.round(3).to_numpy(),
+    }).drop_duplicates("KodSH").set_index("KodSH")
+
+def add_day_night_astral(df, stations):
+    # Dzień jako datetime64 (int64) zamiast obiektów datetime.date
+    df["date"] = df["datetime"].dt.normalize()
+
+    # Para (stacja, dzień) zakodowana jako int – indeksowanie tablic zamiast merge
+    pair_codes, pairs = pd.MultiIndex.from_arrays([df["KodSH"], df["date"]]).factorize()
+    loc = stations.reindex(pairs.get_level_values(0).astype(str))
+    lat = loc["lat"].to_numpy(dtype="float64")
+    lon = loc["lon"].to_numpy(dtype="float64")
+    doy = pairs.get_level_values(1).dayofyear.to_numpy()
+
+    # Wschód/zachód liczone raz dla każdej trójki (lat, lon, dzień)
+    sun_codes = (
+        pd.DataFrame({"lat": lat, "lon": lon, "doy": doy})
+        .groupby(["lat", "lon", "doy"], sort=False, dropna=False)
+        .ngroup()
+        .to_numpy()
     )
-    df.loc[mask, "period"] = "dzien"
-
-    return df.drop(columns=["geometry", "dt_local", "sun_key", "sunrise", "sunset"])
+    first = np.unique(sun_codes, return_index=True)[1]
+    sunrise, sunset = solar_times_utc(lat[first], lon[first], doy[first])
+
+    # Wschód/zachód jako int64 ns od epoki dla każdej pary (stacja, dzień);
+    # brak współrzędnych -> przedział pusty, czyli zawsze noc
+    sunrise, sunset = sunrise[sun_codes], sunset[sun_codes]
+    known = ~(np.isnan(sunrise) | np.isnan(sunset))
+    day_ns = pairs.get_level_values(1).to_numpy(dtype="datetime64[ns]").view("i8")
+    sunrise_ns = np.full(len(pairs), np.iinfo(np.int64).max, dtype=np.int64)
+    sunset_ns = np.full(len(pairs), np.iinfo(np.int64).min, dtype=np.int64)
+    sunrise_ns[known] = day_ns[known] + (sunrise[known] * 60e9).astype(np.int64)
+    sunset_ns[known] = day_ns[known] + (sunset[known] * 60e9).astype(np.int64)
+
+    # Czas pomiaru (UTC) porównywany bezpośrednio w int64
+    t_ns = df["datetime"].to_numpy(dtype="datetime64[ns]").view("i8")
+    is_day = (t_ns >= sunrise_ns[pair_codes]) & (t_ns <= sunset_ns[pair_codes])
+    df["period"] = pd.Categorical.from_codes(is_day.astype(np.int8), categories=PERIODS)
+
+    return df
 
 # ================== 4. STATYSTYKI ==================
 
 def compute_stats(df):
-    g = df.groupby(["KodSH", "date", "period"])["Value"]
+    keys = ["KodSH", "date", "period"]
+    g = df.groupby(keys, observed=True)["Value"]
     stats = g.agg(mean="mean", median="median", count="count").reset_index()
-    trimmed = g.apply(lambda x: trim_mean(x, TRIM_PROP)).rename("trimmed_mean").reset_index()
-    return stats.merge(trimmed, on=["KodSH", "date", "period"])
 
-# ================== 5. GEOANALIZA ==================
+    # Średnia ucięta jak scipy.stats.trim_mean (int(TRIM_PROP * n) wartości z każdego
+    # końca): grupy jako kody int, jedno sortowanie, sumy środków z sum prefiksowych
+    n_groups = g.ngroups
+    codes = g.ngroup().to_numpy()
+    values = df["Value"].to_numpy(dtype="float64")
+    order = np.lexsort((values, codes))
+    codes, values = codes[order], values[order]
 
-def aggregate_by_admin(stats, eff, admin, admin_id, prefix):
-    code_field = next((c for c in ["KodSH", "ifcid", "IFCID", "kod", "station_id", "id"] if c in eff.columns), None)
-    if code_field is None:
-        raise KeyError("Brak pola ID stacji w effacility")
+    starts = np.searchsorted(codes, np.arange(n_groups))
+    counts = np.diff(np.append(starts, len(codes)))
+    cut = (counts * TRIM_PROP).astype(int)
 
-    eff2 = eff[[code_field, "geometry"]].copy().to_crs(admin.crs)
-    eff2[code_field] = eff2[code_field].astype(str)
-    stats["KodSH"] = stats["KodSH"].astype(str)
+    prefix = np.concatenate(([0.0], np.cumsum(values)))
+    sums = prefix[starts + counts - cut] - prefix[starts + cut]
 
-    gdf = gpd.GeoDataFrame(
-        stats.merge(eff2, left_on="KodSH", right_on=code_field, how="left"),
-        geometry="geometry",
-        crs=admin.crs
-    )
+    stats["trimmed_mean"] = sums / (counts - 2 * cut)
+    return stats
+
+# ================== 5. GEOANALIZA ==================
 
-    admin2 = admin[[admin_id, "geometry"]].to_crs(gdf.crs)
-    joined = gpd.sjoin(gdf, admin2, predicate="within")
+STATION_CODE_FIELDS = ["KodSH", "ifcid", "IFCID", "kod", "station_id", "id"]
 
-    agg = joined.groupby([admin_id, "date", "period"], as_index=False).agg(
+def find_station_code_field(eff):
+    code_field = next((c for c in STATION_CODE_FIELDS if c in eff.columns), None)
+    if code_field is None:
+        raise KeyError("Brak pola ID stacji w effacility")
+    return code_field
+
+def build_admin_index(admin, admin_id):
+    # Wielokąty przygotowane (prepared) raz na warstwę – każdy test punktu korzysta z ich indeksu krawędzi
+    geoms = admin.geometry.to_numpy()
+    shapely.prepare(geoms)
+    return {
+        "geoms": geoms,
+        "ids": admin[admin_id].to_numpy(),
+        "crs": admin.crs,
+    }
+
+def map_stations_to_admin(eff, admin_index, column):
+    code_field = find_station_code_field(eff)
+
+    pts = eff[[code_field, "geometry"]]
+    if pts.crs != admin_index["crs"]:
+        pts = pts.to_crs(admin_index["crs"])
+
+    # Punkt-w-wielokącie: jedno zapytanie STRtree z predykatem zamiast pełnego sjoin;
+    # drzewo na punktach, a zapytaniem są przygotowane wielokąty (contains)
+    tree = shapely.STRtree(pts.geometry.to_numpy())
+    adm_idx, st_idx = tree.query(admin_index["geoms"], predicate="contains")
+    return pd.DataFrame({
+        "KodSH": pts[code_field].astype(str).to_numpy()[st_idx],
+        column: admin_index["ids"][adm_idx],
+    })
+
+def build_station_admin(eff, voiv_index):
+    # Przypisanie stacja -> województwo nie zależy od parametru – liczone raz
+    return map_stations_to_admin(eff, voiv_index, "id")
+
+def aggregate_by_admin(stats, station_admin, admin_id, prefix):
+    # Jednostka wyznaczana raz na kategorię KodSH (kilkaset stacji),
+    # a wiersze statystyk odczytują ją po kodzie int – bez łączenia per wiersz
+    lookup = (
+        station_admin.dropna(subset=[admin_id])
+        .drop_duplicates("KodSH")
+        .set_index("KodSH")[admin_id]
+    )
+    # Pozycje całkowite (-1 = stacja bez jednostki) zamiast reindex z NaN – kolumna
+    # jednostki zachowuje typ z station_admin (int64 nie zamienia się w float64)
+    kod = stats["KodSH"].astype("category")
+    per_station = lookup.index.get_indexer(kod.cat.categories.astype(str))
+    codes = kod.cat.codes.to_numpy()
+    pos = np.where(codes >= 0, per_station[codes], -1)
+    mask = pos >= 0
+    joined = stats[mask].assign(**{admin_id: lookup.to_numpy()[pos[mask]]})
+
+    agg = joined.groupby([admin_id, "date", "period"], as_index=False, observed=True).agg(
         mean=("mean", "mean"),
         median=("median", "median"),
         trimmed_mean=("trimmed_mean", "mean"),
         count=("count", "sum")
     )
 
-    agg.to_csv(os.path.join(OUTPUT_DIR, f"{prefix}.csv"), index=False)
+    save_output(agg, prefix)
     return agg
 
 def compute_changes(df, admin_id):
-    df["date"] = pd.to_datetime(df["date"])
-    df = df.set_index("date")
+    # Numer okna CHANGE_FREQ liczony wektorowo od wspólnego początku –
+    # jeden groupby zamiast osobnego resample dla każdej grupy
+    keys = [admin_id, "period"]
+    if df.empty:
+        # Brak danych (np. żadna stacja parametru nie leży w jednostce) – pusta ramka jak z resample
+        return pd.DataFrame(columns=keys + ["date", "mean", "median", "mean_change", "median_change"])
+    step = pd.Timedelta(CHANGE_FREQ)
+    origin = df["date"].min().normalize()
 
     res = (
-        df.groupby([admin_id, "period"])
-        .resample(CHANGE_FREQ)
+        df.assign(bucket=((df["date"] - origin) // step).to_numpy())
+        .groupby(keys + ["bucket"], observed=True)
         .agg(mean=("mean", "mean"), median=("median", "median"))
         .reset_index()
     )
+    res.insert(len(keys), "date", origin + res["bucket"] * step)
 
-    res["mean_change"] = res.groupby([admin_id, "period"])["mean"].diff()
-    res["median_change"] = res.groupby([admin_id, "period"])["median"].diff()
-    return res
+    # Wynik groupby jest posortowany po (jednostka, pora, okno): zmiana to różnica z poprzednim
+    # wierszem tej samej grupy i sąsiedniego okna (puste okno przerywa ciąg jak w resample)
+    unit, period, bucket = (res[c].to_numpy() for c in (admin_id, "period", "bucket"))
+    adjacent = np.zeros(len(res), dtype=bool)
+    adjacent[1:] = (unit[1:] == unit[:-1]) & (period[1:] == period[:-1]) & (np.diff(bucket) == 1)
+
+    values = res[["mean", "median"]].to_numpy(dtype="float64")
+    changes = np.full_like(values, np.nan)
+    changes[1:] = values[1:] - values[:-1]
+    changes[~adjacent] = np.nan
+    res[["mean_change", "median_change"]] = changes
+    return res.drop(columns="bucket")
 
 # ================== 6. WIZUALIZACJA ==================
 
@@ -222,43 +428,57 @@ def plot_changes(changes, admin_id, fname):
     sample = changes.dropna().iloc[0][admin_id]
     d = changes[changes[admin_id] == sample]
 
-    plt.plot(d["date"], d["mean_change"], label="Zmiana średniej")
-    plt.plot(d["date"], d["median_change"], label="Zmiana mediany")
-    plt.legend()
-    plt.title("Zmiany wartości w czasie")
-    plt.savefig(os.path.join(OUTPUT_DIR, fname), dpi=150)
-    plt.close()
+    # Jedna figura na proces, czyszczona przy każdym wykresie zamiast tworzenia nowej
+    fig = plt.figure(num="changes", clear=True)
+    ax = fig.add_subplot()
+    ax.plot(d["date"], d["mean_change"], label="Zmiana średniej")
+    ax.plot(d["date"], d["median_change"], label="Zmiana mediany")
+    ax.legend()
+    ax.set_title("Zmiany wartości w czasie")
+    fig.savefig(os.path.join(OUTPUT_DIR, fname), dpi=150)
 
-def process_parameter(code, name, ym, eff, voiv, county):
-    obs = read_parameter_csvs([ym], code)
+def process_parameter(code, name, obs, stations, station_admin):
     if obs.empty:
         return
 
-    obs = add_day_night_astral(obs, eff.copy())
+    obs = add_day_night_astral(obs, stations)
     stats = compute_stats(obs)
-    stats.to_csv(os.path.join(OUTPUT_DIR, f"station_{code}.csv"), index=False)
+    save_output(stats, f"station_{code}")
 
-    v = aggregate_by_admin(stats, eff, voiv, "id", f"{code}_voiv")
+    v = aggregate_by_admin(stats, station_admin, "id", f"{code}_voiv")
     vc = compute_changes(v, "id")
-    vc.to_csv(os.path.join(OUTPUT_DIR, f"{code}_voiv_changes.csv"), index=False)
+    save_output(vc, f"{code}_voiv_changes")
 
     if not vc.empty:
         plot_changes(vc, "id", f"{code}_voiv_changes.png")
 
 # ================== MAIN ==================
 
-def run(year, month):
-    ensure_dirs()
-    download_imgw_data(year, month)
+def run(year, months):
+    if isinstance(months, int):
+        months = [months]
 
-    ym = f"{year}-{month:02d}"
-    eff = gpd.read_file(EFFACILITY_PATH)
-    voiv = gpd.read_file(ADMIN_VOIV_PATH)
-    county = gpd.read_file(ADMIN_COUNTY_PATH)
-
-    with ThreadPoolExecutor(max_workers=4) as ex:
+    ensure_dirs()
+    download_imgw_months(year, months)
+
+    year_months = [f"{year}-{m:02d}" for m in months]
+    # pyogrio czyta warstwy wektorowo do tablic, z granic tylko kolumna "id",
+    # ze stacji tylko pole kodu (potrzebne są wszystkie stacje, więc bez filtra bbox)
+    eff_fields = pyogrio.read_info(EFFACILITY_PATH)["fields"]
+    eff = gpd.read_file(EFFACILITY_PATH, engine="pyogrio",
+                        columns=[c for c in STATION_CODE_FIELDS if c in eff_fields][:1])
+    # Indeksy przestrzenne i przypisanie stacji budowane raz dla wszystkich parametrów
+    voiv = build_admin_index(gpd.read_file(ADMIN_VOIV_PATH, engine="pyogrio", columns=["id"]), "id")
+    eff = eff.to_crs(voiv["crs"])
+    station_admin = build_station_admin(eff, voiv)
+    stations = station_coordinates(eff)
+
+    observations = read_all_parameters(year_months, PARAMETERS.keys())
+
+    # Przetwarzanie parametrów jest CPU-bound (pandas) – osobne procesy omijają GIL
+    with ProcessPoolExecutor(max_workers=min(len(PARAMETERS), os.cpu_count() or 1)) as ex:
         for f in [
-            ex.submit(process_parameter, code, name, ym, eff, voiv, county)
+            ex.submit(process_parameter, code, name, observations[code], stations, station_admin)
             for code, name in PARAMETERS.items()
         ]:
             f.result()
@@ -266,7 +486,7 @@ def run(year, month):
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Analiza danych IMGW")
     parser.add_argument("--year", type=int, required=True)
-    parser.add_argument("--month", type=int, required=True)
+    parser.add_argument("--month", type=int, nargs="+", required=True)
     args = parser.parse_args()
 
     run(args.year, args.month)
@@ -2,9 +2,13 @@
 Moduł do połączenia z bazami danych MongoDB i Redis
 """
 
-from pymongo import MongoClient
-from redis import Redis
+from pymongo import MongoClient, UpdateOne
+from redis import Redis, BlockingConnectionPool
 import json
+import queue
+import threading
+import time
+from collections import Counter
 from datetime import datetime
 
 # Konfiguracja połączeń
@@ -12,20 +16,37 @@ MONGO_URI = "mongodb://localhost:27017/"
 MONGO_DB_NAME = "meteo_db"
 REDIS_HOST = "localhost"
 REDIS_PORT = 6379
+DB_POOL_SIZE = 16  # maksymalna liczba połączeń w puli (MongoDB i Redis)
+MONGO_BULK_SIZE = 1000  # operacji na jedno wywołanie bulk_write
+QUERY_COUNTERS_KEY = "query_counter:all"  # hash: typ zapytania -> licznik (zastępuje klucze query_counter:{typ})
+COUNTER_FLUSH_INTERVAL = 0.5  # sekundy zbierania liczników przed zapisem
+SERIES_INDEX_KEY = "meteo:series"  # zbiór kluczy serii meteo:{stacja}:{parametr} (uzupełnia import_data)
 
 # Globalne połączenia
 mongo_client = None
 mongo_db = None
 redis_client = None
+redis_pool = None
+
+# Liczniki zapytań czekające na zbiorczy zapis do Redis
+_counter_queue = queue.Queue()
+_counter_thread = None
+_counter_lock = threading.Lock()
+_counter_event = threading.Event()  # ustawiany przy każdym nowym zapytaniu
 
 
 def connect_mongodb():
     """Nawiązuje połączenie z MongoDB"""
     global mongo_client, mongo_db
     try:
-        mongo_client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+        # Jeden klient z pulą połączeń na cały czas działania - ponowne łączenie tylko sprawdza serwer
+        if mongo_client is None:
+            mongo_client = MongoClient(
+                MONGO_URI, serverSelectionTimeoutMS=5000, maxPoolSize=DB_POOL_SIZE, minPoolSize=2
+            )
         mongo_client.server_info()  # Test połączenia
         mongo_db = mongo_client[MONGO_DB_NAME]
+        ensure_mongo_indexes()
         print("[OK] Połączono z MongoDB")
         return True
     except Exception as e:
@@ -35,11 +56,21 @@ def connect_mongodb():
 
 def connect_redis():
     """Nawiązuje połączenie z Redis"""
-    global redis_client
+    global redis_client, redis_pool
     try:
-        redis_client = Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True, socket_connect_timeout=5)
+        # Wspólna pula połączeń dla wszystkich wątków GUI, tworzona raz
+        if redis_pool is None:
+            redis_pool = BlockingConnectionPool(
+                host=REDIS_HOST, port=REDIS_PORT, decode_responses=True,
+                socket_connect_timeout=5, max_connections=DB_POOL_SIZE, timeout=5
+            )
+            redis_client = Redis(connection_pool=redis_pool)
         redis_client.ping()
         print("[OK] Połączono z Redis")
+        try:
+            migrate_query_counters()
+        except Exception as e:
+            print(f"[WARNING] Nie można przenieść starych liczników zapytań: {e}")
         return True
     except Exception as e:
         print(f"[ERROR] Nie można połączyć z Redis: {e}")
@@ -55,15 +86,47 @@ def connect_all():
 
 def close_connections():
     """Zamyka wszystkie połączenia"""
-    global mongo_client, redis_client
+    global mongo_client, mongo_db, redis_client, redis_pool
+    flush_query_counters()
     if mongo_client:
         mongo_client.close()
-    if redis_client:
-        redis_client.close()
+    if redis_pool:
+        redis_pool.disconnect()
+    mongo_client, mongo_db, redis_client, redis_pool = None, None, None, None
 
 
 # ==================== MongoDB Operations ====================
 
+def ensure_mongo_indexes(database=None):
+    """Tworzy indeksy używane przez filtry upsertów i zapytań (GUI i import_data)"""
+    database = mongo_db if database is None else database
+    if database is None:
+        return False
+
+    try:
+        database["meteo_data"].create_index(
+            [("station_id", 1), ("date", 1), ("parameter_code", 1)], unique=True
+        )
+        database["statistics"].create_index(
+            [("admin_id", 1), ("admin_type", 1), ("date", 1), ("parameter_code", 1)], unique=True
+        )
+        database["stations"].create_index("station_id", unique=True)
+        database["stations"].create_index("wojewodztwo_norm")
+        database["stations"].create_index("powiat_norm")
+        database["admin_units"].create_index([("name", 1), ("type", 1)])
+        database["admin_units"].create_index("type")
+        return True
+    except Exception as e:
+        print(f"[WARNING] Nie można utworzyć indeksów MongoDB: {e}")
+        return False
+
+
+def _bulk_upsert(collection, ops):
+    """Wykonuje upserty partiami po MONGO_BULK_SIZE bez zachowania kolejności"""
+    for i in range(0, len(ops), MONGO_BULK_SIZE):
+        collection.bulk_write(ops[i:i + MONGO_BULK_SIZE], ordered=False)
+
+
 def save_meteo_data_mongo(station_id, date, parameter_code, data):
     """Zapisuje dane meteorologiczne do MongoDB"""
     if mongo_db is None:
@@ -85,6 +148,24 @@ def save_meteo_data_mongo(station_id, date, parameter_code, data):
     return True
 
 
+def save_meteo_data_mongo_bulk(records):
+    """Zapisuje wiele rekordów danych meteorologicznych do MongoDB jednym bulk_write"""
+    if mongo_db is None:
+        return False
+
+    now = datetime.now()
+    ops = [
+        UpdateOne(
+            {"station_id": r["station_id"], "date": r["date"], "parameter_code": r["parameter_code"]},
+            {"$set": {**r, "created_at": now}},
+            upsert=True
+        )
+        for r in records
+    ]
+    _bulk_upsert(mongo_db["meteo_data"], ops)
+    return True
+
+
 def get_meteo_data_mongo(station_id=None, date=None, parameter_code=None):
     """Pobiera dane meteorologiczne z MongoDB"""
     if mongo_db is None:
@@ -156,6 +237,23 @@ def get_stations_by_admin_mongo(admin_id, admin_type="powiat"):
     return [doc["station_id"] for doc in result]
 
 
+def normalize_admin_name(name):
+    """Nazwa jednostki w postaci do porównań (pola *_norm w kolekcji stations)"""
+    return (name or "").strip().lower()
+
+
+def get_stations_by_admin_norm(admin_id, admin_type="powiat", station_ids=None):
+    """Pobiera stacje jednostki po znormalizowanej nazwie (zapytanie po indeksie *_norm)"""
+    if mongo_db is None:
+        return []
+
+    query = {f"{admin_type}_norm": normalize_admin_name(admin_id)}
+    if station_ids is not None:
+        query["station_id"] = {"$in": list(station_ids)}
+    result = mongo_db["stations"].find(query, {"_id": 0, "station_id": 1})
+    return sorted(doc["station_id"] for doc in result)
+
+
 def save_station_mongo(station_id, name, powiat=None, wojewodztwo=None, lat=None, lon=None):
     """Zapisuje stację do MongoDB"""
     if mongo_db is None:
@@ -167,6 +265,8 @@ def save_station_mongo(station_id, name, powiat=None, wojewodztwo=None, lat=None
         "name": name,
         "powiat": powiat,
         "wojewodztwo": wojewodztwo,
+        "powiat_norm": normalize_admin_name(powiat),
+        "wojewodztwo_norm": normalize_admin_name(wojewodztwo),
         "lat": lat,
         "lon": lon,
         "created_at": datetime.now()
@@ -216,6 +316,24 @@ def save_statistics_mongo(admin_id, admin_type, date, parameter_code, stats):
     return True
 
 
+def save_statistics_mongo_bulk(records):
+    """Zapisuje wiele statystyk do MongoDB jednym bulk_write"""
+    if mongo_db is None:
+        return False
+
+    now = datetime.now()
+    ops = [
+        UpdateOne(
+            {"admin_id": r["admin_id"], "admin_type": r["admin_type"], "date": r["date"], "parameter_code": r["parameter_code"]},
+            {"$set": {**r, "created_at": now}},
+            upsert=True
+        )
+        for r in records
+    ]
+    _bulk_upsert(mongo_db["statistics"], ops)
+    return True
+
+
 # ==================== Redis Operations ====================
 
 def cache_set(key, value, expire_seconds=3600):
@@ -223,9 +341,26 @@ def cache_set(key, value, expire_seconds=3600):
     if redis_client is None:
         return False
 
+    redis_client.setex(key, expire_seconds, _encode_cache_value(value))
+    return True
+
+
+def _encode_cache_value(value):
+    """Koduje słowniki i listy jako zwarty JSON (bez spacji)"""
     if isinstance(value, (dict, list)):
-        value = json.dumps(value)
-    redis_client.setex(key, expire_seconds, value)
+        return json.dumps(value, separators=(",", ":"))
+    return value
+
+
+def cache_set_many(items, expire_seconds=3600):
+    """Zapisuje wiele wartości do cache Redis jednym potokiem (jeden round-trip)"""
+    if redis_client is None:
+        return False
+
+    with redis_client.pipeline(transaction=False) as pipe:
+        for key, value in items.items():
+            pipe.setex(key, expire_seconds, _encode_cache_value(value))
+        pipe.execute()
     return True
 
 
@@ -234,7 +369,11 @@ def cache_get(key):
     if redis_client is None:
         return None
 
-    value = redis_client.get(key)
+    return _decode_cache_value(redis_client.get(key))
+
+
+def _decode_cache_value(value):
+    """Dekoduje wartość z cache (JSON, a gdy się nie da - surowy tekst)"""
     if value:
         try:
             return json.loads(value)
@@ -252,6 +391,24 @@ def cache_delete(key):
     return True
 
 
+def cache_delete_matching(patterns, batch_size=1000):
+    """Usuwa klucze pasujące do wzorców (SCAN + UNLINK w paczkach, bez blokowania Redis); zwraca liczbę kluczy"""
+    if redis_client is None:
+        return 0
+
+    total = 0
+    for pattern in patterns:
+        batch = []
+        for key in redis_client.scan_iter(match=pattern, count=batch_size):
+            batch.append(key)
+            if len(batch) >= batch_size:
+                total += redis_client.unlink(*batch)
+                batch = []
+        if batch:
+            total += redis_client.unlink(*batch)
+    return total
+
+
 def cache_meteo_stats(admin_id, date, parameter_code, stats, period="dzien"):
     """Cachuje statystyki meteorologiczne"""
     key = f"meteo_stats:{admin_id}:{date}:{parameter_code}:{period}"
@@ -276,13 +433,129 @@ def get_cached_admin_list(admin_type):
     return cache_get(key)
 
 
+def get_cached_admin_lists(admin_types):
+    """Pobiera kilka zcachowanych list jednostek jednym potokiem Redis (jeden round-trip)"""
+    if redis_client is None:
+        return [None] * len(admin_types)
+
+    with redis_client.pipeline(transaction=False) as pipe:
+        for admin_type in admin_types:
+            pipe.get(f"admin_list:{admin_type}")
+        values = pipe.execute()
+    return [_decode_cache_value(v) for v in values]
+
+
+def cache_admin_stations(admin_type, admin_id, station_ids, expire_seconds=86400):
+    """Cachuje zbiór stacji z danymi należących do jednostki administracyjnej (SET z TTL)"""
+    if redis_client is None or not station_ids:
+        return False
+
+    key = f"admin_list:{admin_type}:{admin_id.lower()}"
+    with redis_client.pipeline(transaction=False) as pipe:
+        pipe.delete(key)
+        pipe.sadd(key, *station_ids)
+        pipe.expire(key, expire_seconds)
+        pipe.execute()
+    return True
+
+
+def get_cached_admin_stations(admin_type, admin_id):
+    """Pobiera zcachowany zbiór stacji jednostki administracyjnej (pusty, gdy brak)"""
+    if redis_client is None:
+        return set()
+
+    return redis_client.smembers(f"admin_list:{admin_type}:{admin_id.lower()}")
+
+
+def get_series_station_ids(parameter_code):
+    """Zwraca stacje mające serię parametru - ze zbioru indeksu serii, a bez niego przez SCAN"""
+    if redis_client is None:
+        return set()
+
+    suffix = f":{parameter_code}"
+    keys = redis_client.smembers(SERIES_INDEX_KEY)
+    if not keys:
+        # Dane zaimportowane przed wprowadzeniem indeksu - nieblokujący SCAN zamiast KEYS
+        keys = redis_client.scan_iter(match=f"meteo:*{suffix}", count=1000)
+    return {k.split(":")[1] for k in keys if k.endswith(suffix)}
+
+
 def increment_query_counter(query_type):
-    """Inkrementuje licznik zapytań"""
+    """Dodaje zapytanie do kolejki liczników i zwraca od razu (zapis do Redis w tle).
+
+    Zwraca True, gdy zapytanie zostało zakolejkowane (False bez połączenia z Redis);
+    aktualną wartość licznika podaje get_query_counter.
+    """
+    global _counter_thread
     if redis_client is None:
+        return False
+
+    _counter_queue.put((query_type, 1))
+    _counter_event.set()
+    with _counter_lock:
+        if _counter_thread is None:
+            _counter_thread = threading.Thread(target=_query_counter_worker, daemon=True)
+            _counter_thread.start()
+    return True
+
+
+def _query_counter_worker():
+    """Czeka na sygnał nowego zapytania, zbiera kolejne przez COUNTER_FLUSH_INTERVAL i zapisuje je razem"""
+    while True:
+        _counter_event.wait()
+        time.sleep(COUNTER_FLUSH_INTERVAL)
+        _counter_event.clear()
+        flush_query_counters()
+
+
+def flush_query_counters():
+    """Zapisuje zebrane liczniki jednym potokiem HINCRBY (przy błędzie wracają do kolejki)"""
+    if redis_client is None:
+        return False
+
+    counts = Counter()
+    while True:
+        try:
+            query_type, n = _counter_queue.get_nowait()
+        except queue.Empty:
+            break
+        counts[query_type] += n
+
+    if not counts:
+        return True
+
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for query_type, n in counts.items():
+            pipe.hincrby(QUERY_COUNTERS_KEY, query_type, n)
+        pipe.execute()
+        return True
+    except Exception as e:
+        print(f"[WARNING] Nie można zapisać liczników zapytań: {e}")
+        for item in counts.items():
+            _counter_queue.put(item)
+        return False
+
+
+def migrate_query_counters():
+    """Przenosi liczniki z dawnych osobnych kluczy query_counter:{typ} do hasha QUERY_COUNTERS_KEY"""
+    if redis_client is None:
+        return 0
+
+    legacy = [k for k in redis_client.scan_iter(match="query_counter:*", count=1000)
+              if k != QUERY_COUNTERS_KEY]
+    if not legacy:
         return 0
 
-    key = f"query_counter:{query_type}"
-    return redis_client.incr(key)
+    values = redis_client.mget(legacy)
+    with redis_client.pipeline(transaction=True) as pipe:
+        for key, value in zip(legacy, values):
+            if value is not None:
+                pipe.hincrby(QUERY_COUNTERS_KEY, key.split(":", 1)[1], int(value))
+            pipe.delete(key)
+        pipe.execute()
+    print(f"[INFO] Przeniesiono {len(legacy)} liczników zapytań do {QUERY_COUNTERS_KEY}")
+    return len(legacy)
 
 
 def get_query_counter(query_type):
@@ -290,8 +563,7 @@ def get_query_counter(query_type):
     if redis_client is None:
         return 0
 
-    key = f"query_counter:{query_type}"
-    value = redis_client.get(key)
+    value = redis_client.hget(QUERY_COUNTERS_KEY, query_type)
     return int(value) if value else 0
 
 
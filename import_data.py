@@ -7,12 +7,22 @@ Skrypt do importu danych do MongoDB i Redis
 import os
 import glob
 import json
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 import geopandas as gpd
+import pyogrio
+import numpy as np
 import pandas as pd
-from pymongo import MongoClient
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import csv as pacsv
+from pymongo import MongoClient, UpdateOne
 from redis import Redis
 
+# Format daty i parsowanie wartości IMGW wspólne z analizą (jedna definicja)
+from app1 import DATE_FORMAT, parse_decimal_comma
+from db_connection import ensure_mongo_indexes
+
 # Konfiguracja
 MONGO_URI = "mongodb://localhost:27017/"
 MONGO_DB = "meteo_db"
@@ -23,6 +33,10 @@ EFFACILITY_PATH = "Dane_administracyjne/effacility.geojson"
 ADMIN_VOIV_PATH = "Dane_administracyjne/woj.shp"
 ADMIN_COUNTY_PATH = "Dane_administracyjne/powiaty.shp"
 DANE_METEO_DIR = "dane_meteo"
+BULK_SIZE = 1000  # operacji MongoDB na jedno wywołanie bulk_write
+ADMIN_NEAREST_MAX_DISTANCE = 2000  # m - stacje tuż poza granicą (wybrzeże) dopasowywane do najbliższej jednostki
+REDIS_BATCH_SIZE = 50000  # członów ZADD na jedno wykonanie potoku
+SERIES_INDEX_KEY = "meteo:series"  # zbiór kluczy serii meteo:{stacja}:{parametr}
 
 PARAMETERS = {
     "B00300S": "Temperatura powietrza",
@@ -39,6 +53,63 @@ PARAMETERS = {
 }
 
 
+STATION_COLUMNS = ['ifcid', 'id_localid', 'name1', 'name', 'additional', 'responsibl', 'activitype']
+ADMIN_NAME_COLUMNS = ['nazwa', 'name', 'NAME', 'JPT_NAZWA_', 'jpt_nazwa_', 'id']
+
+PARAMETER_SET = pa.array(list(PARAMETERS.keys()), type=pa.string())
+
+
+def read_layer(path, columns):
+    """Wczytuje warstwę przez pyogrio tylko z tych kolumn z listy, które w niej istnieją"""
+    fields = set(pyogrio.read_info(path)["fields"])
+    cols = [c for c in columns if c in fields]
+    # Bez żadnej ze znanych kolumn - cała warstwa (szukanie kolumny tekstowej po wczytaniu)
+    return gpd.read_file(path, engine="pyogrio", columns=cols or None)
+
+
+def station_ids(eff):
+    """Zwraca identyfikatory stacji (ifcid lub id_localid) jako tekst"""
+    for col in ['ifcid', 'id_localid']:
+        if col in eff.columns:
+            return eff[col].map(str).to_numpy()
+    return [''] * len(eff)
+
+
+def text_column(gdf, cols, default=None):
+    """Zwraca pierwszą istniejącą kolumnę z listy jako tablicę tekstów (odpowiednik str(row.get))"""
+    for col in cols:
+        if col in gdf.columns:
+            # map(str) jak str() na wartości z wiersza - daty jako '1927-05-09 00:00:00', brak jako 'NaT'
+            return gdf[col].map(str).to_numpy()
+    return default if default is not None else [''] * len(gdf)
+
+
+def admin_layer(gdf, unit_type):
+    """Warstwa jednostek z jedną kolumną nazwy (pierwsza nienumeryczna z kandydatów) i typem"""
+    names = pd.Series(None, index=gdf.index, dtype=object)
+    for col in ['name', 'nazwa', 'NAME']:
+        if col in gdf.columns:
+            val = gdf[col].astype(str)
+            # Pomiń ID numeryczne
+            digits = val.str.replace('.', '', regex=False).str.replace('-', '', regex=False)
+            ok = gdf[col].notna() & ~digits.str.isdigit()
+            names = names.where(names.notna(), val.where(ok))
+
+    layer = gpd.GeoDataFrame(
+        {"admin_name": names.to_numpy(), "admin_type": unit_type},
+        geometry=gdf.geometry.to_numpy(),
+        crs=gdf.crs
+    )
+    return layer[layer["admin_name"].notna()]
+
+
+def flush_bulk(collection, ops, force=False):
+    """Wysyła zebrane operacje bulk_write, gdy jest ich BULK_SIZE (lub wszystkie przy force)"""
+    if ops and (force or len(ops) >= BULK_SIZE):
+        collection.bulk_write(ops, ordered=False)
+        ops.clear()
+
+
 def connect_mongodb():
     """Łączy się z MongoDB"""
     try:
@@ -51,10 +122,22 @@ def connect_mongodb():
         return None
 
 
+def open_redis():
+    """Tworzy klienta Redis do długich importów (keepalive, ponawianie po timeoucie)"""
+    return Redis(
+        host=REDIS_HOST,
+        port=REDIS_PORT,
+        decode_responses=True,
+        socket_keepalive=True,
+        health_check_interval=30,
+        retry_on_timeout=True
+    )
+
+
 def connect_redis():
     """Łączy się z Redis"""
     try:
-        r = Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
+        r = open_redis()
         r.ping()
         print("[OK] Połączono z Redis")
 
@@ -83,41 +166,46 @@ def import_stations_to_mongodb(mongo_client):
     collection = db["stations"]
 
     # Wczytaj dane stacji
-    eff = gpd.read_file(EFFACILITY_PATH)
+    eff = read_layer(EFFACILITY_PATH, STATION_COLUMNS)
     eff = eff.to_crs(4326)  # Konwersja do WGS84
 
+    # Kolumny wyciągane raz jako tablice zamiast boksowania każdego wiersza przez iterrows
+    ids = station_ids(eff)
+    names = text_column(eff, ['name1', 'name'], ids)
+    additional = text_column(eff, ['additional'])
+    responsible = text_column(eff, ['responsibl'])
+    activity = text_column(eff, ['activitype'])
+
+    # Współrzędne - brak dla pustych geometrii
+    missing = (eff.geometry.isna() | eff.geometry.is_empty).to_numpy()
+    lons = eff.geometry.x.to_numpy()
+    lats = eff.geometry.y.to_numpy()
+
+    now = datetime.now()
+    ops = []
     count = 0
-    for _, row in eff.iterrows():
-        station_id = str(row.get('ifcid', row.get('id_localid', '')))
+    for station_id, name, add, resp, act, lon, lat, miss in zip(
+        ids, names, additional, responsible, activity, lons, lats, missing
+    ):
         if not station_id:
             continue
 
-        # Pobierz współrzędne
-        geom = row.geometry
-        lat, lon = None, None
-        if geom and not geom.is_empty:
-            lon, lat = geom.x, geom.y
-
         doc = {
             "station_id": station_id,
-            "name": str(row.get('name1', row.get('name', station_id))),
-            "additional": str(row.get('additional', '')),
-            "lat": lat,
-            "lon": lon,
-            "responsible": str(row.get('responsibl', '')),
-            "activity_start": str(row.get('activitype', '')),
-            "updated_at": datetime.now()
+            "name": name,
+            "additional": add,
+            "lat": None if miss else float(lat),
+            "lon": None if miss else float(lon),
+            "responsible": resp,
+            "activity_start": act,
+            "updated_at": now
         }
 
-        collection.update_one(
-            {"station_id": station_id},
-            {"$set": doc},
-            upsert=True
-        )
+        ops.append(UpdateOne({"station_id": station_id}, {"$set": doc}, upsert=True))
+        flush_bulk(collection, ops)
         count += 1
 
-    # Utwórz indeks
-    collection.create_index("station_id", unique=True)
+    flush_bulk(collection, ops, force=True)
 
     print(f"[OK] Zaimportowano {count} stacji")
     return count
@@ -130,17 +218,18 @@ def import_admin_units_to_mongodb(mongo_client):
     db = mongo_client[MONGO_DB]
     collection = db["admin_units"]
 
+    ops = []
     count = 0
 
     # Województwa
     if os.path.exists(ADMIN_VOIV_PATH):
         try:
-            voiv = gpd.read_file(ADMIN_VOIV_PATH)
+            voiv = read_layer(ADMIN_VOIV_PATH, ADMIN_NAME_COLUMNS)
             voiv = voiv.to_crs(4326)
 
             # Znajdź kolumnę z nazwą
             name_col = None
-            for col in ['nazwa', 'name', 'NAME', 'JPT_NAZWA_', 'jpt_nazwa_', 'id']:
+            for col in ADMIN_NAME_COLUMNS:
                 if col in voiv.columns:
                     name_col = col
                     break
@@ -153,26 +242,27 @@ def import_admin_units_to_mongodb(mongo_client):
                         break
 
             if name_col:
-                for _, row in voiv.iterrows():
-                    name = str(row[name_col])
-                    geom = row.geometry
-                    centroid = geom.centroid if geom else None
+                # Centroidy liczone wektorowo dla całej warstwy (jedno wywołanie GEOS)
+                missing = (voiv.geometry.isna() | voiv.geometry.is_empty).to_numpy()
+                cents = voiv.geometry.centroid
+                cx, cy = cents.x.to_numpy(), cents.y.to_numpy()
+                now = datetime.now()
 
+                for name, lon, lat, miss in zip(voiv[name_col].astype(str), cx, cy, missing):
                     doc = {
                         "name": name,
                         "type": "wojewodztwo",
-                        "lat": centroid.y if centroid else None,
-                        "lon": centroid.x if centroid else None,
-                        "updated_at": datetime.now()
+                        "lat": None if miss else float(lat),
+                        "lon": None if miss else float(lon),
+                        "updated_at": now
                     }
 
-                    collection.update_one(
-                        {"name": name, "type": "wojewodztwo"},
-                        {"$set": doc},
-                        upsert=True
-                    )
+                    ops.append(UpdateOne({"name": name, "type": "wojewodztwo"}, {"$set": doc}, upsert=True))
+                    flush_bulk(collection, ops)
                     count += 1
 
+                flush_bulk(collection, ops, force=True)
+
                 print(f"[OK] Zaimportowano {len(voiv)} województw")
         except Exception as e:
             print(f"[WARNING] Błąd przy województwach: {e}")
@@ -180,12 +270,12 @@ def import_admin_units_to_mongodb(mongo_client):
     # Powiaty
     if os.path.exists(ADMIN_COUNTY_PATH):
         try:
-            county = gpd.read_file(ADMIN_COUNTY_PATH)
+            county = read_layer(ADMIN_COUNTY_PATH, ADMIN_NAME_COLUMNS)
             county = county.to_crs(4326)
 
             # Znajdź kolumnę z nazwą
             name_col = None
-            for col in ['nazwa', 'name', 'NAME', 'JPT_NAZWA_', 'jpt_nazwa_', 'id']:
+            for col in ADMIN_NAME_COLUMNS:
                 if col in county.columns:
                     name_col = col
                     break
@@ -197,34 +287,31 @@ def import_admin_units_to_mongodb(mongo_client):
                         break
 
             if name_col:
-                for _, row in county.iterrows():
-                    name = str(row[name_col])
-                    geom = row.geometry
-                    centroid = geom.centroid if geom else None
+                # Centroidy liczone wektorowo dla całej warstwy (jedno wywołanie GEOS)
+                missing = (county.geometry.isna() | county.geometry.is_empty).to_numpy()
+                cents = county.geometry.centroid
+                cx, cy = cents.x.to_numpy(), cents.y.to_numpy()
+                now = datetime.now()
 
+                for name, lon, lat, miss in zip(county[name_col].astype(str), cx, cy, missing):
                     doc = {
                         "name": name,
                         "type": "powiat",
-                        "lat": centroid.y if centroid else None,
-                        "lon": centroid.x if centroid else None,
-                        "updated_at": datetime.now()
+                        "lat": None if miss else float(lat),
+                        "lon": None if miss else float(lon),
+                        "updated_at": now
                     }
 
-                    collection.update_one(
-                        {"name": name, "type": "powiat"},
-                        {"$set": doc},
-                        upsert=True
-                    )
+                    ops.append(UpdateOne({"name": name, "type": "powiat"}, {"$set": doc}, upsert=True))
+                    flush_bulk(collection, ops)
                     count += 1
 
+                flush_bulk(collection, ops, force=True)
+
                 print(f"[OK] Zaimportowano {len(county)} powiatów")
         except Exception as e:
             print(f"[WARNING] Błąd przy powiatach: {e}")
 
-    # Indeksy
-    collection.create_index([("name", 1), ("type", 1)])
-    collection.create_index("type")
-
     print(f"[OK] Łącznie zaimportowano {count} jednostek administracyjnych")
     return count
 
@@ -233,7 +320,7 @@ def download_sample_meteo_data():
     """Pobiera przykładowe dane meteo z IMGW"""
     import requests
     import zipfile
-    from io import BytesIO
+    import tempfile
 
     year, month = 2024, 10
     ym = f"{year}-{month:02d}"
@@ -249,11 +336,16 @@ def download_sample_meteo_data():
 
     print(f"[INFO] Pobieranie danych IMGW z {url}...")
     try:
-        r = requests.get(url, timeout=300)
-        r.raise_for_status()
+        # Archiwum strumieniowane do pliku tymczasowego (w RAM najwyżej 64 MB)
+        with requests.get(url, stream=True, timeout=300) as r, \
+                tempfile.SpooledTemporaryFile(max_size=64 << 20) as tmp:
+            r.raise_for_status()
+            for chunk in r.iter_content(chunk_size=1 << 20):
+                tmp.write(chunk)
+            tmp.seek(0)
 
-        with zipfile.ZipFile(BytesIO(r.content)) as z:
-            z.extractall(target_dir)
+            with zipfile.ZipFile(tmp) as z:
+                z.extractall(target_dir)
 
         print(f"[OK] Pobrano dane do {target_dir}")
         return target_dir
@@ -262,95 +354,104 @@ def download_sample_meteo_data():
         return None
 
 
-def import_meteo_to_redis(redis_client, mongo_client):
-    """Importuje dane meteorologiczne do Redis (szybka wersja wektoryzowana)"""
-    print("\n--- Importowanie danych meteorologicznych do Redis ---")
+def ingest_meteo_file(csv_file):
+    """Importuje jeden plik CSV do Redis we własnym połączeniu (uruchamiane w procesie roboczym)"""
+    filename = os.path.basename(csv_file)
+    redis_client = open_redis()
+    file_records = 0
 
-    # Sprawdź czy są dane
-    if not os.path.exists(DANE_METEO_DIR):
-        print("[INFO] Brak folderu dane_meteo, próbuję pobrać...")
-        download_sample_meteo_data()
+    try:
+        # Strumieniowy odczyt Arrow (bloki po 8 MB); pliki IMGW nie mają nagłówka
+        cols = ["f0", "f1", "f2", "f3"]
+        reader = pacsv.open_csv(
+            csv_file,
+            read_options=pacsv.ReadOptions(autogenerate_column_names=True, block_size=8 << 20),
+            parse_options=pacsv.ParseOptions(delimiter=";", invalid_row_handler=lambda row: "skip"),
+            convert_options=pacsv.ConvertOptions(
+                include_columns=cols,
+                column_types={c: pa.string() for c in cols},
+                strings_can_be_null=True
+            )
+        )
 
-    # Znajdź wszystkie pliki CSV
-    csv_files = glob.glob(os.path.join(DANE_METEO_DIR, "**", "*.csv"), recursive=True)
+        for batch in reader:
+            # Filtruj znane parametry
+            batch = batch.filter(pc.is_in(batch.column("f1"), value_set=PARAMETER_SET))
 
-    if not csv_files:
-        print("[WARNING] Brak plików CSV z danymi meteorologicznymi")
-        print("[INFO] Tworzę przykładowe dane demonstracyjne...")
-        create_demo_meteo_data(redis_client)
-        return 0
+            if batch.num_rows == 0:
+                continue
 
-    print(f"[INFO] Znaleziono {len(csv_files)} plików CSV")
+            # Wartość i czas konwertowane w Arrow, niepoprawne -> null
+            value = parse_decimal_comma(batch.column("f3"))
+            ts = pc.strptime(pc.utf8_trim_whitespace(batch.column("f2")), format=DATE_FORMAT, unit="ms", error_is_null=True)
+            table = pa.table({
+                "KodSH": batch.column("f0"),
+                "ParametrSH": batch.column("f1"),
+                "ts_ms": pc.cast(ts, pa.int64()),
+                "Value": value,
+            })
+            table = table.filter(pc.and_(pc.is_valid(table["ts_ms"]), pc.is_valid(table["Value"])))
 
-    total_records = 0
-    BATCH_SIZE = 10000
+            if table.num_rows == 0:
+                continue
 
-    for csv_file in csv_files:
-        filename = os.path.basename(csv_file)
-        print(f"[INFO] Przetwarzanie: {filename}...", end=" ", flush=True)
+            # Do pandas dopiero na etapie grupowania
+            df = table.to_pandas()
 
-        try:
-            # Wczytaj plik w kawałkach (chunks) dla oszczędności pamięci
-            chunks = pd.read_csv(
-                csv_file,
-                header=None,
-                delimiter=";",
-                usecols=[0, 1, 2, 3],
-                names=["KodSH", "ParametrSH", "Data", "Value"],
-                dtype=str,
-                on_bad_lines="skip",
-                chunksize=50000
-            )
+            # Człony "ts:wartość" budowane wektorowo, jeden ZADD na serię (stacja, parametr)
+            df["member"] = df["ts_ms"].astype(str) + ":" + df["Value"].astype(str)
 
-            file_records = 0
+            pipe = redis_client.pipeline(transaction=False)
+            batch_count = 0
 
-            for df in chunks:
-                # Filtruj znane parametry
-                df = df[df["ParametrSH"].isin(PARAMETERS.keys())].copy()
+            for (kod, param), g in df.groupby(["KodSH", "ParametrSH"], sort=False):
+                key = f"meteo:{kod}:{param}"
+                pipe.zadd(key, dict(zip(g["member"], g["ts_ms"].tolist())))
+                pipe.sadd(SERIES_INDEX_KEY, key)
+                batch_count += len(g)
 
-                if df.empty:
-                    continue
+                if batch_count >= REDIS_BATCH_SIZE:
+                    pipe.execute()
+                    batch_count = 0
 
-                # Konwersja wartości - wektoryzacja
-                df["Value"] = df["Value"].str.replace(",", ".", regex=False)
-                df["Value"] = pd.to_numeric(df["Value"], errors="coerce")
-                df = df.dropna(subset=["Value"])
+            # Zapisz pozostałe
+            if batch_count > 0:
+                pipe.execute()
 
-                if df.empty:
-                    continue
+            file_records += len(df)
 
-                # Konwersja timestamp - wektoryzacja
-                df["Timestamp"] = pd.to_datetime(df["Data"], errors="coerce")
-                df = df.dropna(subset=["Timestamp"])
-                df["ts_ms"] = (df["Timestamp"].astype('int64') // 10**6).astype(int)
+        print(f"[INFO] {filename}: OK ({file_records} rekordów)")
+    except Exception as e:
+        print(f"[ERROR] {filename}: {e}")
+    finally:
+        redis_client.close()
 
-                # Grupuj po kluczu i zapisz batch'ami
-                pipe = redis_client.pipeline()
-                batch_count = 0
+    return file_records
 
-                for _, row in df.iterrows():
-                    key = f"meteo:{row['KodSH']}:{row['ParametrSH']}"
-                    ts_ms = row["ts_ms"]
-                    value = row["Value"]
 
-                    pipe.zadd(key, {f"{ts_ms}:{value}": ts_ms})
-                    batch_count += 1
-                    file_records += 1
+def import_meteo_to_redis(redis_client, mongo_client):
+    """Importuje dane meteorologiczne do Redis (szybka wersja wektoryzowana)"""
+    print("\n--- Importowanie danych meteorologicznych do Redis ---")
 
-                    if batch_count >= BATCH_SIZE:
-                        pipe.execute()
-                        pipe = redis_client.pipeline()
-                        batch_count = 0
+    # Sprawdź czy są dane
+    if not os.path.exists(DANE_METEO_DIR):
+        print("[INFO] Brak folderu dane_meteo, próbuję pobrać...")
+        download_sample_meteo_data()
 
-                # Zapisz pozostałe
-                if batch_count > 0:
-                    pipe.execute()
+    # Znajdź wszystkie pliki CSV
+    csv_files = glob.glob(os.path.join(DANE_METEO_DIR, "**", "*.csv"), recursive=True)
 
-            total_records += file_records
-            print(f"OK ({file_records} rekordów)")
+    if not csv_files:
+        print("[WARNING] Brak plików CSV z danymi meteorologicznymi")
+        print("[INFO] Tworzę przykładowe dane demonstracyjne...")
+        create_demo_meteo_data(redis_client)
+        return 0
 
-        except Exception as e:
-            print(f"BŁĄD: {e}")
+    print(f"[INFO] Znaleziono {len(csv_files)} plików CSV")
+
+    # Pliki są niezależne - parsowanie rozdzielone na procesy, każdy z własnym połączeniem Redis
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex:
+        total_records = sum(ex.map(ingest_meteo_file, csv_files))
 
     print(f"[OK] Zaimportowano łącznie {total_records} rekordów meteorologicznych do Redis")
     return total_records
@@ -360,9 +461,6 @@ def create_demo_meteo_data(redis_client):
     """Tworzy przykładowe dane demonstracyjne"""
     print("[INFO] Tworzenie danych demonstracyjnych...")
 
-    import random
-    from datetime import timedelta
-
     # Przykładowe stacje
     stations = ["249200160", "249190100", "250200090", "252220120", "250210100"]
 
@@ -381,20 +479,27 @@ def create_demo_meteo_data(redis_client):
     # Generuj dane dla ostatnich 30 dni
     base_date = datetime(2024, 10, 1)
 
+    # Znaczniki czasu co godzinę przez 30 dni - wspólne dla wszystkich serii
+    base_ms = int(base_date.timestamp() * 1000)
+    ts_arr = base_ms + np.arange(30 * 24, dtype=np.int64) * 3_600_000
+    ts_str = ts_arr.astype(str)
+    ts_list = ts_arr.tolist()
+    rng = np.random.default_rng()
+
     count = 0
+    pipe = redis_client.pipeline(transaction=False)
     for station_id in stations:
         for param_code, (min_val, max_val) in param_ranges.items():
-            for day in range(30):
-                for hour in range(24):
-                    timestamp = base_date + timedelta(days=day, hours=hour)
-                    ts_ms = int(timestamp.timestamp() * 1000)
+            # Wartości z pewną zmiennością - losowane naraz dla całej serii
+            values = rng.uniform(min_val, max_val, ts_arr.size)
+            members = np.char.add(np.char.add(ts_str, ":"), np.char.mod("%.2f", values))
 
-                    # Wartość z pewną zmiennością
-                    value = random.uniform(min_val, max_val)
+            key = f"meteo:{station_id}:{param_code}"
+            pipe.zadd(key, dict(zip(members.tolist(), ts_list)))
+            pipe.sadd(SERIES_INDEX_KEY, key)
+            count += ts_arr.size
 
-                    key = f"meteo:{station_id}:{param_code}"
-                    redis_client.zadd(key, {f"{ts_ms}:{value:.2f}": ts_ms})
-                    count += 1
+    pipe.execute()
 
     print(f"[OK] Utworzono {count} rekordów demonstracyjnych")
     return count
@@ -410,72 +515,72 @@ def create_station_admin_mapping(mongo_client):
         print("[ERROR] Brak pliku stacji")
         return
 
-    eff = gpd.read_file(EFFACILITY_PATH)
+    eff = read_layer(EFFACILITY_PATH, ['ifcid', 'id_localid'])
 
     # Wczytaj województwa i powiaty
     voiv_gdf = None
     county_gdf = None
 
     if os.path.exists(ADMIN_VOIV_PATH):
-        voiv_gdf = gpd.read_file(ADMIN_VOIV_PATH)
+        voiv_gdf = read_layer(ADMIN_VOIV_PATH, ['name', 'nazwa', 'NAME'])
 
     if os.path.exists(ADMIN_COUNTY_PATH):
-        county_gdf = gpd.read_file(ADMIN_COUNTY_PATH)
+        county_gdf = read_layer(ADMIN_COUNTY_PATH, ['name', 'nazwa', 'NAME'])
 
     if voiv_gdf is None and county_gdf is None:
         print("[WARNING] Brak danych administracyjnych do mapowania")
         return
 
-    # Konwersja CRS
-    if voiv_gdf is not None:
-        eff_voiv = eff.to_crs(voiv_gdf.crs)
-        joined_voiv = gpd.sjoin(eff_voiv, voiv_gdf, predicate="within", how="left")
+    # Stacje przeliczane do układu granic tylko raz (woj. i powiaty zwykle w tym samym CRS)
+    target_crs = voiv_gdf.crs if voiv_gdf is not None else county_gdf.crs
+    if county_gdf is not None and county_gdf.crs != target_crs:
+        county_gdf = county_gdf.to_crs(target_crs)
+    eff_proj = eff.to_crs(target_crs)
 
+    layers = {}
+    if voiv_gdf is not None:
+        layers["wojewodztwo"] = admin_layer(voiv_gdf, "wojewodztwo")
     if county_gdf is not None:
-        eff_county = eff.to_crs(county_gdf.crs)
-        joined_county = gpd.sjoin(eff_county, county_gdf, predicate="within", how="left")
-
-    # Aktualizuj stacje w MongoDB
-    collection = db["stations"]
-
-    count = 0
-    for idx, row in eff.iterrows():
-        station_id = str(row.get('ifcid', row.get('id_localid', '')))
-        if not station_id:
+        layers["powiat"] = admin_layer(county_gdf, "powiat")
+
+    # Jeden sjoin na połączonej warstwie (jedno drzewo R) zamiast osobnego dla każdego typu
+    admin = pd.concat(list(layers.values()), ignore_index=True)
+    stations = eff_proj[["geometry"]]
+    joined = gpd.sjoin(stations, admin, predicate="within", how="inner")
+    pairs = pd.DataFrame({
+        "station": joined.index,
+        "admin_type": joined["admin_type"].to_numpy(),
+        "admin_name": joined["admin_name"].to_numpy()
+    }).drop_duplicates(["station", "admin_type"])  # punkt na granicy - zostaje pierwsza jednostka
+
+    mapping = pairs.pivot(index="station", columns="admin_type", values="admin_name")
+    mapping = mapping.reindex(index=eff.index, columns=list(layers))
+
+    # Stacje poza wszystkimi wielokątami danego typu - najbliższa jednostka w promieniu
+    for unit_type, layer in layers.items():
+        missing = mapping.index[mapping[unit_type].isna()]
+        if len(missing) == 0:
             continue
+        near = gpd.sjoin_nearest(
+            stations.loc[missing], layer, how="inner", max_distance=ADMIN_NEAREST_MAX_DISTANCE
+        )
+        near = near[~near.index.duplicated(keep="first")]
+        mapping.loc[near.index, unit_type] = near["admin_name"]
 
-        update_doc = {}
-
-        # Dodaj województwo
-        if voiv_gdf is not None and idx < len(joined_voiv):
-            voiv_row = joined_voiv.iloc[idx]
-            # Szukaj kolumny z nazwą - sjoin dodaje suffix _right
-            for col in ['name_right', 'name', 'nazwa_right', 'nazwa', 'NAME_right', 'NAME']:
-                if col in voiv_row.index and pd.notna(voiv_row[col]):
-                    val = str(voiv_row[col])
-                    # Sprawdź czy to nie jest ID numeryczne
-                    if not val.replace('.', '').replace('-', '').isdigit():
-                        update_doc["wojewodztwo"] = val
-                        break
+    # Aktualizuj stacje w MongoDB jednym bulk_write
+    collection = db["stations"]
 
-        # Dodaj powiat
-        if county_gdf is not None and idx < len(joined_county):
-            county_row = joined_county.iloc[idx]
-            # Szukaj kolumny z nazwą - sjoin dodaje suffix _right
-            for col in ['name_right', 'name', 'nazwa_right', 'nazwa', 'NAME_right', 'NAME']:
-                if col in county_row.index and pd.notna(county_row[col]):
-                    val = str(county_row[col])
-                    # Sprawdź czy to nie jest ID numeryczne
-                    if not val.replace('.', '').replace('-', '').isdigit():
-                        update_doc["powiat"] = val
-                        break
+    ops = []
+    for station_id, rec in zip(station_ids(eff), mapping.to_dict("records")):
+        update_doc = {k: v for k, v in rec.items() if pd.notna(v)}
+        # Znormalizowane nazwy do wyszukiwania równością po indeksie
+        update_doc.update({f"{k}_norm": str(v).strip().lower() for k, v in list(update_doc.items())})
+        if station_id and update_doc:
+            ops.append(UpdateOne({"station_id": station_id}, {"$set": update_doc}))
 
-        if update_doc:
-            collection.update_one(
-                {"station_id": station_id},
-                {"$set": update_doc}
-            )
-            count += 1
+    if ops:
+        collection.bulk_write(ops, ordered=False)
+    count = len(ops)
 
     print(f"[OK] Zaktualizowano mapowanie dla {count} stacji")
 
@@ -516,13 +621,14 @@ def verify_import(mongo_client, redis_client):
         print(f"  - Przykładowa stacja: {sample_station.get('station_id')} - {sample_station.get('name')}")
 
     # Redis
-    meteo_keys = redis_client.keys("meteo:*:*")
+    # Liczba serii ze zbioru indeksu (SCARD, O(1)) zamiast KEYS blokującego serwer
+    series_count = redis_client.scard(SERIES_INDEX_KEY)
     print(f"\nRedis:")
-    print(f"  - Klucze meteo: {len(meteo_keys)}")
+    print(f"  - Klucze meteo: {series_count}")
 
-    # Przykładowe dane
-    if meteo_keys:
-        sample_key = meteo_keys[0]
+    # Przykładowe dane - pierwszy klucz z przyrostowego SCAN
+    sample_key = next(redis_client.scan_iter(match="meteo:*:*", count=1000), None)
+    if sample_key:
         sample_data = redis_client.zrange(sample_key, 0, 2, withscores=True)
         print(f"  - Przykładowy klucz: {sample_key}")
         if sample_data:
@@ -546,6 +652,8 @@ def main():
         return
 
     try:
+        ensure_mongo_indexes(mongo_client[MONGO_DB])
+
         # Import do MongoDB
         import_stations_to_mongodb(mongo_client)
         import_admin_units_to_mongodb(mongo_client)
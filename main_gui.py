@@ -6,19 +6,70 @@ z wykorzystaniem MongoDB i Redis
 import tkinter as tk
 from tkinter import ttk, messagebox
 from tkcalendar import Calendar
-from PIL import Image, ImageTk, ImageDraw
+from PIL import Image, ImageTk, ImageColor
 import os
+import json
 import threading
+from collections import OrderedDict
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import numpy as np
+import pandas as pd
+import pyogrio
 import geopandas as gpd
 
 # Import modułów baz danych i analizy
 import db_connection as db
 from app1 import (
-    PARAMETERS, EFFACILITY_PATH, ADMIN_VOIV_PATH, ADMIN_COUNTY_PATH,
+    PARAMETERS, ADMIN_VOIV_PATH, ADMIN_COUNTY_PATH,
     read_parameter_csvs, add_day_night_astral, compute_stats
 )
 
+# Lokalny cache list nazw jednostek (Parquet + metadane pliku źródłowego)
+NAMES_CACHE_DIR = "cache"
+
+# Mapowanie kodów parametrów na klucze wyników
+PARAM_RESULT_KEYS = {
+    "B00300S": "temp_powietrza",
+    "B00305A": "temp_gruntu",
+    "B00802A": "wilgotnosc",
+    "B00604S": "opad_dobowy",
+    "B00606S": "opad_godzinowy",
+    "B00608S": "opad_10min",
+    "B00702A": "predkosc_wiatru",
+    "B00202A": "kierunek_wiatru",
+    "B00703A": "maks_predkosc",
+    "B00714A": "poryw"
+}
+# Parametry z jedną wartością na dzień (bez podziału dzień/noc)
+SINGLE_VALUE_RESULTS = ("opad_dobowy", "poryw")
+
+# Liczba ostatnich wyników trzymanych w pamięci procesu (jednostka, data)
+RESULTS_MEMO_SIZE = 64
+
+# Liczba poleceń Redis w jednym wykonaniu potoku przy pobieraniu danych
+REDIS_PIPELINE_SIZE = 500
+# Liczba parametrów pobieranych z Redis równolegle
+FETCH_WORKERS = 8
+
+
+@lru_cache(maxsize=512)
+def sun_times(date):
+    """Zwraca (wschód, zachód) słońca dla centrum Polski w danym dniu (YYYY-MM-DD)"""
+    from astral import LocationInfo
+    from astral.sun import sun
+
+    selected_date = datetime.strptime(date, "%Y-%m-%d")
+    try:
+        location = LocationInfo("Poland", "Poland", "Europe/Warsaw", 52.0, 19.0)
+        s = sun(location.observer, date=selected_date)
+        return s["sunrise"].replace(tzinfo=None), s["sunset"].replace(tzinfo=None)
+    except Exception:
+        # Domyślne wartości
+        return selected_date.replace(hour=6, minute=0), selected_date.replace(hour=18, minute=0)
+
+
 # Kolory motywu
 COLORS = {
     "bg_dark": "#1a1a2e",        # Ciemne tło
@@ -57,22 +108,43 @@ class MeteoApp:
         # Dane administracyjne
         self.wojewodztwa = []
         self.powiaty = []
-        self.voiv_gdf = None
-        self.county_gdf = None
-        self.eff_gdf = None
+        self.woj_pow = {}  # województwo -> powiaty
+        self._station_admin = None  # stacja -> (województwo, powiat), małymi literami
+
+        # Ostatnie wyniki w pamięci: (typ, jednostka, data) -> wyniki
+        self._results_memo = OrderedDict()
+        self._results_memo_lock = threading.Lock()
+        self._calc_seq = 0  # numer ostatniego żądania obliczeń (starsze nie wyświetlają wyników)
+
+        # Pasek statusu - komunikat czekający na odświeżenie
+        self._pending_status = ""
+        self._status_scheduled = False
 
         # Obrazki (będą utworzone jako placeholder)
         self.images = {}
 
-        # Inicjalizacja
+        self._startup_pool = ThreadPoolExecutor(max_workers=2)
+        self._connect_future = None
+
         self.create_placeholder_images()
         self.setup_ui()
+
+        # Połączenie z bazami i odczyt nazw jednostek startują w tle dopiero po wejściu
+        # w pętlę Tk - wątki mogą wtedy bezpiecznie wołać root.after
+        self.root.after_idle(self.start_background_loading)
+
+    def start_background_loading(self):
+        """Uruchamia w tle połączenie z bazami i ładowanie danych administracyjnych"""
         self.connect_databases()
         self.load_admin_data()
 
     def setup_styles(self):
-        """Konfiguruje style ttk"""
-        style = ttk.Style()
+        """Konfiguruje style ttk (raz na interpreter Tk - style ttk są wspólne dla okien)"""
+        if getattr(self.root, "_meteo_styles_done", False):
+            return
+        self.root._meteo_styles_done = True
+
+        style = ttk.Style(self.root)
         style.theme_use('clam')
 
         # Styl dla Combobox
@@ -91,9 +163,8 @@ class MeteoApp:
                  selectforeground=[('readonly', COLORS["text_light"])])
 
     def create_placeholder_images(self):
-        """Tworzy placeholder obrazki jeśli nie istnieją"""
+        """Tworzy placeholder obrazki (w pamięci), chyba że w img/ są własne pliki"""
         img_dir = "img"
-        os.makedirs(img_dir, exist_ok=True)
 
         # Definicje obrazków z nowymi kolorami
         image_defs = {
@@ -104,20 +175,23 @@ class MeteoApp:
             "wind": (COLORS["wind_color"], "#7F8C8D")      # Szary wiatr
         }
 
+        # Maski koła (promień 20) i obwódki (2 px) liczone raz dla wszystkich obrazków
+        yy, xx = np.ogrid[:50, :50]
+        dist2 = (xx - 25) ** 2 + (yy - 25) ** 2
+        circle = dist2 <= 20 ** 2
+        ring = circle & (dist2 > 18 ** 2)
+
         for name, (bg_color, fg_color) in image_defs.items():
-            path = os.path.join(img_dir, f"{name}.png")
-            if not os.path.exists(path):
-                # Tworzenie prostego obrazka
-                img = Image.new("RGBA", (50, 50), (255, 255, 255, 0))
-                draw = ImageDraw.Draw(img)
-                draw.ellipse([5, 5, 45, 45], fill=fg_color, outline=bg_color, width=2)
-                img.save(path)
-
-        # Ładowanie obrazków
-        for name in image_defs.keys():
             path = os.path.join(img_dir, f"{name}.png")
             try:
-                img = Image.open(path)
+                if os.path.exists(path):
+                    img = Image.open(path)
+                else:
+                    buf = np.zeros((50, 50, 4), dtype=np.uint8)
+                    buf[circle] = ImageColor.getrgb(fg_color) + (255,)
+                    buf[ring] = ImageColor.getrgb(bg_color) + (255,)
+                    img = Image.fromarray(buf, "RGBA")
+
                 if name in ["moon", "sun"]:
                     img = img.resize((24, 24))
                 else:
@@ -290,6 +364,9 @@ class MeteoApp:
                                      bg=COLORS["bg_medium"])
                 sun_label.pack(side=tk.LEFT, pady=10, padx=60, expand=True)
 
+        # Zmienne etykiet wyników: klucz wyniku -> statystyka -> (noc, dzień)
+        self.stat_vars = {}
+
         # Kontener na 3 kolumny wyników
         results_container = tk.Frame(self.results_frame, bg=COLORS["bg_medium"])
         results_container.pack(expand=True, fill=tk.BOTH, padx=5)
@@ -320,7 +397,8 @@ class MeteoApp:
         frame = tk.Frame(parent, bg=COLORS["frame_bg"])
         frame.pack(fill=tk.X)
 
-        night_label = tk.Label(frame, text="-", width=10,
+        night_var = tk.StringVar(value="-")
+        night_label = tk.Label(frame, textvariable=night_var, width=10,
                                bg=COLORS["frame_bg"], fg=COLORS["text_light"],
                                font=("Segoe UI", 10, "bold"))
         night_label.pack(side=tk.LEFT, pady=5, padx=5, expand=True)
@@ -330,12 +408,20 @@ class MeteoApp:
                              font=("Segoe UI", 9))
         sep_label.pack(side=tk.LEFT, pady=5, padx=5)
 
-        day_label = tk.Label(frame, text="-", width=10,
+        day_var = tk.StringVar(value="-")
+        day_label = tk.Label(frame, textvariable=day_var, width=10,
                              bg=COLORS["frame_bg"], fg=COLORS["text_light"],
                              font=("Segoe UI", 10, "bold"))
         day_label.pack(side=tk.LEFT, pady=5, padx=5, expand=True)
 
-        return night_label, day_label
+        return night_var, day_var
+
+    def create_stat_rows(self, parent, result_key):
+        """Tworzy wiersze średniej i mediany i rejestruje ich zmienne w tabeli wyników"""
+        self.stat_vars[result_key] = {
+            "mean": self.create_stat_row(parent, "srednia"),
+            "median": self.create_stat_row(parent, "mediana"),
+        }
 
     def create_temperature_section(self):
         """Tworzy sekcję temperatury"""
@@ -352,8 +438,7 @@ class MeteoApp:
                                     font=("Segoe UI", 9))
         t_pow_frame.pack(fill=tk.X, padx=5, pady=5)
 
-        self.t_pow_night_sr, self.t_pow_day_sr = self.create_stat_row(t_pow_frame, "srednia")
-        self.t_pow_night_med, self.t_pow_day_med = self.create_stat_row(t_pow_frame, "mediana")
+        self.create_stat_rows(t_pow_frame, "temp_powietrza")
 
         # Temperatura gruntu
         t_grunt_frame = tk.LabelFrame(self.temp_frame, text="Gruntu [°C]",
@@ -361,8 +446,7 @@ class MeteoApp:
                                       font=("Segoe UI", 9))
         t_grunt_frame.pack(fill=tk.X, padx=5, pady=5)
 
-        self.t_grunt_night_sr, self.t_grunt_day_sr = self.create_stat_row(t_grunt_frame, "srednia")
-        self.t_grunt_night_med, self.t_grunt_day_med = self.create_stat_row(t_grunt_frame, "mediana")
+        self.create_stat_rows(t_grunt_frame, "temp_gruntu")
 
         # Wilgotność
         wilg_frame = tk.LabelFrame(self.temp_frame, text="Wilgotność [%]",
@@ -370,8 +454,7 @@ class MeteoApp:
                                    font=("Segoe UI", 9))
         wilg_frame.pack(fill=tk.X, padx=5, pady=5)
 
-        self.wilg_night_sr, self.wilg_day_sr = self.create_stat_row(wilg_frame, "srednia")
-        self.wilg_night_med, self.wilg_day_med = self.create_stat_row(wilg_frame, "mediana")
+        self.create_stat_rows(wilg_frame, "wilgotnosc")
 
     def create_opad_section(self):
         """Tworzy sekcję opadu"""
@@ -388,7 +471,8 @@ class MeteoApp:
                                        font=("Segoe UI", 9))
         opad_dob_frame.pack(fill=tk.X, padx=5, pady=5)
 
-        self.opad_dobowy_label = tk.Label(opad_dob_frame, text="-",
+        self.opad_dobowy_var = tk.StringVar(value="-")
+        self.opad_dobowy_label = tk.Label(opad_dob_frame, textvariable=self.opad_dobowy_var,
                                           bg=COLORS["frame_bg"], fg=COLORS["rain_color"],
                                           font=("Segoe UI", 14, "bold"))
         self.opad_dobowy_label.pack(pady=10)
@@ -399,8 +483,7 @@ class MeteoApp:
                                         font=("Segoe UI", 9))
         opad_godz_frame.pack(fill=tk.X, padx=5, pady=5)
 
-        self.opad_godz_night_sr, self.opad_godz_day_sr = self.create_stat_row(opad_godz_frame, "srednia")
-        self.opad_godz_night_med, self.opad_godz_day_med = self.create_stat_row(opad_godz_frame, "mediana")
+        self.create_stat_rows(opad_godz_frame, "opad_godzinowy")
 
         # Opad 10-minutowy
         opad_10_frame = tk.LabelFrame(self.opad_frame, text="10-min [mm]",
@@ -408,8 +491,7 @@ class MeteoApp:
                                       font=("Segoe UI", 9))
         opad_10_frame.pack(fill=tk.X, padx=5, pady=5)
 
-        self.opad_10_night_sr, self.opad_10_day_sr = self.create_stat_row(opad_10_frame, "srednia")
-        self.opad_10_night_med, self.opad_10_day_med = self.create_stat_row(opad_10_frame, "mediana")
+        self.create_stat_rows(opad_10_frame, "opad_10min")
 
     def create_wind_section(self):
         """Tworzy sekcję wiatru"""
@@ -426,8 +508,7 @@ class MeteoApp:
                                    font=("Segoe UI", 9))
         pred_frame.pack(fill=tk.X, padx=5, pady=5)
 
-        self.pred_wiatr_night_sr, self.pred_wiatr_day_sr = self.create_stat_row(pred_frame, "srednia")
-        self.pred_wiatr_night_med, self.pred_wiatr_day_med = self.create_stat_row(pred_frame, "mediana")
+        self.create_stat_rows(pred_frame, "predkosc_wiatru")
 
         # Kierunek wiatru
         kier_frame = tk.LabelFrame(self.wiatr_frame, text="Kierunek wiatru",
@@ -435,8 +516,7 @@ class MeteoApp:
                                    font=("Segoe UI", 9))
         kier_frame.pack(fill=tk.X, padx=5, pady=5)
 
-        self.kier_wiatr_night_sr, self.kier_wiatr_day_sr = self.create_stat_row(kier_frame, "srednia")
-        self.kier_wiatr_night_med, self.kier_wiatr_day_med = self.create_stat_row(kier_frame, "mediana")
+        self.create_stat_rows(kier_frame, "kierunek_wiatru")
 
         # Maks prędkość
         maks_frame = tk.LabelFrame(self.wiatr_frame, text="Maks. prędkość",
@@ -444,8 +524,7 @@ class MeteoApp:
                                    font=("Segoe UI", 9))
         maks_frame.pack(fill=tk.X, padx=5, pady=5)
 
-        self.maks_pred_night_sr, self.maks_pred_day_sr = self.create_stat_row(maks_frame, "srednia")
-        self.maks_pred_night_med, self.maks_pred_day_med = self.create_stat_row(maks_frame, "mediana")
+        self.create_stat_rows(maks_frame, "maks_predkosc")
 
         # Największy poryw
         poryw_frame = tk.LabelFrame(self.wiatr_frame, text="Największy poryw",
@@ -453,7 +532,8 @@ class MeteoApp:
                                     font=("Segoe UI", 9))
         poryw_frame.pack(fill=tk.X, padx=5, pady=5)
 
-        self.poryw_label = tk.Label(poryw_frame, text="-",
+        self.poryw_var = tk.StringVar(value="-")
+        self.poryw_label = tk.Label(poryw_frame, textvariable=self.poryw_var,
                                     bg=COLORS["frame_bg"], fg=COLORS["wind_color"],
                                     font=("Segoe UI", 14, "bold"))
         self.poryw_label.pack(pady=10)
@@ -466,9 +546,16 @@ class MeteoApp:
         self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
 
     def set_status(self, message):
-        """Ustawia status"""
-        self.status_bar.config(text=message)
-        self.root.update_idletasks()
+        """Ustawia status (ostatni komunikat wygrywa, odświeżenie najwyżej co 50 ms)"""
+        self._pending_status = message
+        if not self._status_scheduled:
+            self._status_scheduled = True
+            self.root.after(50, self._flush_status)
+
+    def _flush_status(self):
+        """Wpisuje oczekujący komunikat do paska statusu"""
+        self._status_scheduled = False
+        self.status_bar.config(text=self._pending_status)
 
     def connect_databases(self):
         """Łączy się z bazami danych"""
@@ -477,7 +564,10 @@ class MeteoApp:
 
             self.root.after(0, lambda: self.update_db_status(mongo_ok, redis_ok))
 
-        threading.Thread(target=connect_thread, daemon=True).start()
+        # Ponowne kliknięcie w trakcie łączenia nie uruchamia drugiego wątku
+        if self._connect_future is not None and not self._connect_future.done():
+            return
+        self._connect_future = self._startup_pool.submit(connect_thread)
 
     def update_db_status(self, mongo_ok, redis_ok):
         """Aktualizuje status połączeń"""
@@ -495,9 +585,14 @@ class MeteoApp:
         """Ładuje dane administracyjne"""
         def load_thread():
             try:
-                # Próba pobrania z cache
-                cached_woj = db.get_cached_admin_list("wojewodztwa")
-                cached_pow = db.get_cached_admin_list("powiaty")
+                # Cache Redis jest dostępny dopiero po zakończeniu łączenia
+                if self._connect_future is not None:
+                    self._connect_future.result()
+
+                # Próba pobrania z cache - wszystkie listy jednym potokiem Redis
+                cached_woj, cached_pow, cached_map = db.get_cached_admin_lists(
+                    ["wojewodztwa", "powiaty", "woj_pow_map"]
+                )
 
                 if cached_woj and cached_pow:
                     self.wojewodztwa = cached_woj
@@ -506,55 +601,28 @@ class MeteoApp:
                     # Ładowanie z plików shapefile
                     self.load_from_shapefiles()
 
+                self.woj_pow = cached_map or self.load_woj_pow_map()
+
                 self.root.after(0, self.update_dropdowns)
 
             except Exception as e:
                 print(f"[ERROR] Błąd ładowania danych: {e}")
                 self.root.after(0, lambda: self.set_status(f"Błąd ładowania danych: {e}"))
 
-        threading.Thread(target=load_thread, daemon=True).start()
+        self._startup_pool.submit(load_thread)
 
     def load_from_shapefiles(self):
         """Ładuje dane z plików shapefile"""
         try:
             if os.path.exists(ADMIN_VOIV_PATH):
-                self.voiv_gdf = gpd.read_file(ADMIN_VOIV_PATH)
-                # Próba znalezienia kolumny z nazwą
-                name_cols = ['nazwa', 'name', 'NAME', 'JPT_NAZWA_', 'jpt_nazwa_']
-                for col in name_cols:
-                    if col in self.voiv_gdf.columns:
-                        self.wojewodztwa = sorted(self.voiv_gdf[col].dropna().unique().tolist())
-                        break
-
-                if not self.wojewodztwa and len(self.voiv_gdf.columns) > 1:
-                    # Użyj pierwszej kolumny tekstowej
-                    for col in self.voiv_gdf.columns:
-                        if self.voiv_gdf[col].dtype == 'object':
-                            self.wojewodztwa = sorted(self.voiv_gdf[col].dropna().unique().tolist())
-                            break
-
+                self.wojewodztwa = self.load_admin_names(ADMIN_VOIV_PATH, "wojewodztwa")
                 # Cache
                 db.cache_admin_list("wojewodztwa", self.wojewodztwa)
 
             if os.path.exists(ADMIN_COUNTY_PATH):
-                self.county_gdf = gpd.read_file(ADMIN_COUNTY_PATH)
-                name_cols = ['nazwa', 'name', 'NAME', 'JPT_NAZWA_', 'jpt_nazwa_']
-                for col in name_cols:
-                    if col in self.county_gdf.columns:
-                        self.powiaty = sorted(self.county_gdf[col].dropna().unique().tolist())
-                        break
-
-                if not self.powiaty and len(self.county_gdf.columns) > 1:
-                    for col in self.county_gdf.columns:
-                        if self.county_gdf[col].dtype == 'object':
-                            self.powiaty = sorted(self.county_gdf[col].dropna().unique().tolist())
-                            break
-
+                self.powiaty = self.load_admin_names(ADMIN_COUNTY_PATH, "powiaty")
                 db.cache_admin_list("powiaty", self.powiaty)
 
-            if os.path.exists(EFFACILITY_PATH):
-                self.eff_gdf = gpd.read_file(EFFACILITY_PATH)
-
         except Exception as e:
             print(f"[ERROR] Błąd ładowania shapefiles: {e}")
             # Ustaw przykładowe dane
@@ -565,6 +633,121 @@ class MeteoApp:
                                "wielkopolskie", "zachodniopomorskie"]
             self.powiaty = ["Przykładowy powiat 1", "Przykładowy powiat 2"]
 
+    def load_woj_pow_map(self):
+        """Buduje słownik województwo -> posortowane powiaty jednym sjoin (i zapisuje do cache)"""
+        if not (os.path.exists(ADMIN_VOIV_PATH) and os.path.exists(ADMIN_COUNTY_PATH)):
+            return {}
+
+        # Lokalny cache mapy, jeśli żaden z plików się nie zmienił - bez czytania geometrii
+        mapping = self.load_woj_pow_cache()
+        if mapping is not None:
+            return mapping
+
+        try:
+            voiv_col = self._find_name_column(pyogrio.read_info(ADMIN_VOIV_PATH))
+            pow_col = self._find_name_column(pyogrio.read_info(ADMIN_COUNTY_PATH))
+            voiv = pyogrio.read_dataframe(ADMIN_VOIV_PATH, columns=[voiv_col])
+            county = pyogrio.read_dataframe(ADMIN_COUNTY_PATH, columns=[pow_col])
+            voiv = voiv.rename(columns={voiv_col: "wojewodztwo"})
+            county = county.rename(columns={pow_col: "powiat"})
+
+            # Punkt wewnątrz powiatu zawsze leży w jego województwie
+            points = county.set_geometry(county.geometry.representative_point()).to_crs(voiv.crs)
+            joined = gpd.sjoin(points, voiv, predicate="within")
+
+            mapping = (
+                joined.groupby("wojewodztwo")["powiat"]
+                .agg(lambda s: np.sort(pd.unique(s.dropna()).astype(str)).tolist())
+                .to_dict()
+            )
+            db.cache_admin_list("woj_pow_map", mapping)
+            self.save_woj_pow_cache(mapping)
+            return mapping
+        except Exception as e:
+            print(f"[WARNING] Nie można zbudować mapy województwo -> powiaty: {e}")
+            return {}
+
+    def load_admin_names(self, path, cache_name):
+        """Zwraca posortowaną listę nazw jednostek z warstwy (lokalny cache lub sama kolumna nazwy)"""
+        # Lista nazw z lokalnego cache, jeśli plik się nie zmienił
+        names = self.load_names_cache(path, cache_name)
+        if names is not None:
+            return names
+
+        names = []
+        col = self._find_name_column(pyogrio.read_info(path))
+        if col:
+            # Tylko kolumna z nazwą, bez geometrii i pozostałych atrybutów
+            df = pyogrio.read_dataframe(path, columns=[col], read_geometry=False)
+            # Sortowanie na tablicy napisów NumPy zamiast listy obiektów Pythona
+            names = np.sort(pd.unique(df[col].dropna()).astype(str)).tolist()
+
+        self.save_names_cache(path, cache_name, names)
+        return names
+
+    @staticmethod
+    def _find_name_column(info, candidates=('nazwa', 'name', 'NAME', 'JPT_NAZWA_', 'jpt_nazwa_')):
+        """Wybiera kolumnę z nazwą: pierwsza z kandydatów, a bez nich pierwsza kolumna tekstowa"""
+        fields = set(info["fields"])
+        col = next((c for c in candidates if c in fields), None)
+        if col is None:
+            col = next((f for f, t in zip(info["fields"], info["dtypes"]) if t == "object"), None)
+        return col
+
+    def load_names_cache(self, path, cache_name):
+        """Zwraca listę nazw z cache Parquet, jeśli plik źródłowy się nie zmienił"""
+        base = os.path.join(NAMES_CACHE_DIR, cache_name)
+        try:
+            with open(base + ".json", encoding="utf-8") as f:
+                meta = json.load(f)
+            st = os.stat(path)
+            if meta == {"mtime_ns": st.st_mtime_ns, "size": st.st_size}:
+                return pd.read_parquet(base + ".parquet")["name"].tolist()
+        except Exception:
+            pass
+        return None
+
+    def save_names_cache(self, path, cache_name, names):
+        """Zapisuje listę nazw do cache Parquet z metadanymi pliku źródłowego"""
+        try:
+            os.makedirs(NAMES_CACHE_DIR, exist_ok=True)
+            base = os.path.join(NAMES_CACHE_DIR, cache_name)
+            st = os.stat(path)
+            pd.DataFrame({"name": names}).to_parquet(base + ".parquet", index=False)
+            with open(base + ".json", "w", encoding="utf-8") as f:
+                json.dump({"mtime_ns": st.st_mtime_ns, "size": st.st_size}, f)
+        except Exception as e:
+            print(f"[WARNING] Nie można zapisać cache nazw {cache_name}: {e}")
+
+    @staticmethod
+    def _woj_pow_sources():
+        """Metadane (mtime_ns, size) obu plików, z których budowana jest mapa województwo -> powiaty"""
+        sources = {}
+        for path in (ADMIN_VOIV_PATH, ADMIN_COUNTY_PATH):
+            st = os.stat(path)
+            sources[path] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+        return sources
+
+    def load_woj_pow_cache(self):
+        """Zwraca mapę województwo -> powiaty z lokalnego cache JSON, jeśli pliki źródłowe się nie zmieniły"""
+        try:
+            with open(os.path.join(NAMES_CACHE_DIR, "woj_pow_map.json"), encoding="utf-8") as f:
+                cached = json.load(f)
+            if cached["sources"] == self._woj_pow_sources():
+                return cached["mapping"]
+        except Exception:
+            pass
+        return None
+
+    def save_woj_pow_cache(self, mapping):
+        """Zapisuje mapę województwo -> powiaty do lokalnego cache JSON z metadanymi plików źródłowych"""
+        try:
+            os.makedirs(NAMES_CACHE_DIR, exist_ok=True)
+            with open(os.path.join(NAMES_CACHE_DIR, "woj_pow_map.json"), "w", encoding="utf-8") as f:
+                json.dump({"sources": self._woj_pow_sources(), "mapping": mapping}, f, ensure_ascii=False)
+        except Exception as e:
+            print(f"[WARNING] Nie można zapisać cache mapy województwo -> powiaty: {e}")
+
     def update_dropdowns(self):
         """Aktualizuje listy rozwijane"""
         self.wojewodztwo_dropdown['values'] = self.wojewodztwa
@@ -581,6 +764,10 @@ class MeteoApp:
     def on_wojewodztwo_selected(self, event=None):
         """Obsługuje wybór województwa"""
         woj = self.selected_wojewodztwo.get()
+        # Lista powiatów zawężona do wybranego województwa
+        self.powiat_dropdown['values'] = self.woj_pow.get(woj, self.powiaty)
+        if self.selected_powiat.get() not in self.powiat_dropdown['values']:
+            self.selected_powiat.set("Wybierz")
         self.set_status(f"Wybrano województwo: {woj}")
         db.increment_query_counter("wojewodztwo_selection")
 
@@ -603,6 +790,19 @@ class MeteoApp:
             messagebox.showwarning("Uwaga", "Wybierz datę")
             return
 
+        # Nowe żądanie unieważnia obliczenia jeszcze trwające w tle
+        self._calc_seq += 1
+        req_id = self._calc_seq
+
+        # Wynik z pamięci - bez zapytań do baz
+        memo_key = ("wojewodztwo", woj, date)
+        memo = self.get_memo_results(memo_key)
+        if memo is not None:
+            db.increment_query_counter("stats_memo_hit")
+            self.display_results(memo)
+            self.set_status("Wyniki z pamięci")
+            return
+
         self.set_status(f"Obliczanie dla województwa: {woj}...")
 
         def calc_thread():
@@ -610,19 +810,29 @@ class MeteoApp:
                 # Sprawdź cache
                 cached = db.get_cached_meteo_stats(woj, date, "all", "wojewodztwo")
                 if cached:
+                    db.increment_query_counter("stats_cache_hit")
+                    self.remember_results(memo_key, cached)
+                    if self.is_stale(req_id):
+                        return
                     self.root.after(0, lambda: self.display_results(cached))
                     self.root.after(0, lambda: self.set_status("Wyniki z cache"))
                     return
 
                 # Oblicz nowe statystyki
-                results = self.calculate_statistics(woj, date, "wojewodztwo")
-
-                # Cache wyniki
-                db.cache_meteo_stats(woj, date, "all", results, "wojewodztwo")
+                db.increment_query_counter("stats_cache_miss")
+                results = self.calculate_statistics(
+                    woj, date, "wojewodztwo", is_stale=lambda: self.is_stale(req_id)
+                )
+                if results is None:
+                    return
+                if db.mongo_db is not None and db.redis_client is not None:
+                    self.remember_results(memo_key, results)
 
-                # Zapisz do MongoDB
-                db.save_statistics_mongo(woj, "wojewodztwo", date, "all", results)
+                # Zapis do cache i MongoDB w tle - UI nie czeka na bazy
+                self._startup_pool.submit(self.save_results, woj, "wojewodztwo", date, results)
 
+                if self.is_stale(req_id):
+                    return
                 self.root.after(0, lambda: self.display_results(results))
                 self.root.after(0, lambda: self.set_status("Obliczenia zakończone"))
 
@@ -647,6 +857,19 @@ class MeteoApp:
             messagebox.showwarning("Uwaga", "Wybierz datę")
             return
 
+        # Nowe żądanie unieważnia obliczenia jeszcze trwające w tle
+        self._calc_seq += 1
+        req_id = self._calc_seq
+
+        # Wynik z pamięci - bez zapytań do baz
+        memo_key = ("powiat", powiat, date)
+        memo = self.get_memo_results(memo_key)
+        if memo is not None:
+            db.increment_query_counter("stats_memo_hit")
+            self.display_results(memo)
+            self.set_status("Wyniki z pamięci")
+            return
+
         self.set_status(f"Obliczanie dla powiatu: {powiat}...")
 
         def calc_thread():
@@ -654,19 +877,29 @@ class MeteoApp:
                 # Sprawdź cache
                 cached = db.get_cached_meteo_stats(powiat, date, "all", "powiat")
                 if cached:
+                    db.increment_query_counter("stats_cache_hit")
+                    self.remember_results(memo_key, cached)
+                    if self.is_stale(req_id):
+                        return
                     self.root.after(0, lambda: self.display_results(cached))
                     self.root.after(0, lambda: self.set_status("Wyniki z cache"))
                     return
 
                 # Oblicz nowe statystyki
-                results = self.calculate_statistics(powiat, date, "powiat")
-
-                # Cache wyniki
-                db.cache_meteo_stats(powiat, date, "all", results, "powiat")
+                db.increment_query_counter("stats_cache_miss")
+                results = self.calculate_statistics(
+                    powiat, date, "powiat", is_stale=lambda: self.is_stale(req_id)
+                )
+                if results is None:
+                    return
+                if db.mongo_db is not None and db.redis_client is not None:
+                    self.remember_results(memo_key, results)
 
-                # Zapisz do MongoDB
-                db.save_statistics_mongo(powiat, "powiat", date, "all", results)
+                # Zapis do cache i MongoDB w tle - UI nie czeka na bazy
+                self._startup_pool.submit(self.save_results, powiat, "powiat", date, results)
 
+                if self.is_stale(req_id):
+                    return
                 self.root.after(0, lambda: self.display_results(results))
                 self.root.after(0, lambda: self.set_status("Obliczenia zakończone"))
 
@@ -678,66 +911,114 @@ class MeteoApp:
 
         threading.Thread(target=calc_thread, daemon=True).start()
 
-    def calculate_statistics(self, admin_id, date, admin_type):
-        """Oblicza statystyki dla danych parametrów pobierając dane z Redis"""
-        import numpy as np
+    def get_station_admin_index(self, station_ids):
+        """Zwraca słownik stacja -> (województwo, powiat); brakujące stacje pobiera z MongoDB jednym zapytaniem $in"""
+        if self._station_admin is None:
+            self._station_admin = {}
+
+        missing = [sid for sid in station_ids if sid not in self._station_admin]
+        if missing:
+            cursor = db.mongo_db["stations"].find(
+                {"station_id": {"$in": missing}},
+                {"_id": 0, "station_id": 1, "wojewodztwo": 1, "powiat": 1}
+            )
+            found = {
+                doc["station_id"]: ((doc.get("wojewodztwo") or "").lower(),
+                                    (doc.get("powiat") or "").lower())
+                for doc in cursor
+            }
+            # Stacje bez dokumentu też zapamiętujemy, żeby nie pytać o nie ponownie
+            for sid in missing:
+                self._station_admin[sid] = found.get(sid, ("", ""))
+        return self._station_admin
+
+    def is_stale(self, req_id):
+        """Czy od żądania req_id użytkownik zlecił już nowsze obliczenia"""
+        return req_id != self._calc_seq
+
+    def get_memo_results(self, key):
+        """Zwraca wyniki z pamięci procesu (lub None) i oznacza je jako ostatnio użyte"""
+        with self._results_memo_lock:
+            results = self._results_memo.get(key)
+            if results is not None:
+                self._results_memo.move_to_end(key)
+            return results
+
+    def remember_results(self, key, results):
+        """Zapamiętuje wyniki, usuwając najdawniej używane ponad RESULTS_MEMO_SIZE"""
+        with self._results_memo_lock:
+            self._results_memo[key] = results
+            self._results_memo.move_to_end(key)
+            if len(self._results_memo) > RESULTS_MEMO_SIZE:
+                self._results_memo.popitem(last=False)
+
+    def save_results(self, admin_id, admin_type, date, results):
+        """Zapisuje wyniki do cache Redis i do MongoDB"""
+        try:
+            db.cache_meteo_stats(admin_id, date, "all", results, admin_type)
+            db.save_statistics_mongo(admin_id, admin_type, date, "all", results)
+        except Exception as e:
+            print(f"[WARNING] Nie można zapisać wyników dla {admin_id}: {e}")
+
+    def fetch_param_values(self, param_code, station_ids, day_start, day_end):
+        """Pobiera (wartości, czasy w ms) parametru ze wszystkich stacji potokiem Redis"""
+        keys = [f"meteo:{station_id}:{param_code}" for station_id in station_ids]
+        data = []
+        for i in range(0, len(keys), REDIS_PIPELINE_SIZE):
+            pipe = db.redis_client.pipeline(transaction=False)
+            for key in keys[i:i + REDIS_PIPELINE_SIZE]:
+                pipe.zrangebyscore(key, day_start, day_end, withscores=True)
+            for response in pipe.execute(raise_on_error=False):
+                if not isinstance(response, Exception):
+                    data.extend(response)
+
+        if not data:
+            return np.empty(0), np.empty(0)
+
+        # Format: "timestamp:value" - wartości nieliczbowe odrzucane jako NaN
+        members, scores = zip(*data)
+        values = pd.to_numeric(
+            pd.Series(members, dtype=object).str.partition(":")[2], errors="coerce"
+        ).to_numpy(dtype=np.float64)
+        scores = np.asarray(scores, dtype=np.float64)
+        valid = ~np.isnan(values)
+        return values[valid], scores[valid]
+
+    def calculate_statistics(self, admin_id, date, admin_type, is_stale=None):
+        """Oblicza statystyki dla danych parametrów pobierając dane z Redis (None, gdy żądanie nieaktualne)"""
         from datetime import datetime, timedelta
-        from astral import LocationInfo
-        from astral.sun import sun
 
+        # Szkielet wyników: jedna wartość albo dzień/noc ze średnią i medianą
         results = {
-            "temp_powietrza": {"dzien": {"mean": None, "median": None}, "noc": {"mean": None, "median": None}},
-            "temp_gruntu": {"dzien": {"mean": None, "median": None}, "noc": {"mean": None, "median": None}},
-            "wilgotnosc": {"dzien": {"mean": None, "median": None}, "noc": {"mean": None, "median": None}},
-            "opad_dobowy": None,
-            "opad_godzinowy": {"dzien": {"mean": None, "median": None}, "noc": {"mean": None, "median": None}},
-            "opad_10min": {"dzien": {"mean": None, "median": None}, "noc": {"mean": None, "median": None}},
-            "predkosc_wiatru": {"dzien": {"mean": None, "median": None}, "noc": {"mean": None, "median": None}},
-            "kierunek_wiatru": {"dzien": {"mean": None, "median": None}, "noc": {"mean": None, "median": None}},
-            "maks_predkosc": {"dzien": {"mean": None, "median": None}, "noc": {"mean": None, "median": None}},
-            "poryw": None
-        }
-
-        # Mapowanie kodów parametrów na klucze wyników
-        param_mapping = {
-            "B00300S": "temp_powietrza",
-            "B00305A": "temp_gruntu",
-            "B00802A": "wilgotnosc",
-            "B00604S": "opad_dobowy",
-            "B00606S": "opad_godzinowy",
-            "B00608S": "opad_10min",
-            "B00702A": "predkosc_wiatru",
-            "B00202A": "kierunek_wiatru",
-            "B00703A": "maks_predkosc",
-            "B00714A": "poryw"
+            result_key: None if result_key in SINGLE_VALUE_RESULTS else
+            {period: {"mean": None, "median": None} for period in ("dzien", "noc")}
+            for result_key in PARAM_RESULT_KEYS.values()
         }
+        param_mapping = PARAM_RESULT_KEYS
 
         if db.mongo_db is None or db.redis_client is None:
             print("[ERROR] Brak połączenia z bazami danych")
             return results
 
-        # Pobierz stacje dla danej jednostki administracyjnej
-        stations_collection = db.mongo_db["stations"]
-
-        # Najpierw pobierz wszystkie stacje z Redis które mają dane
-        all_meteo_keys = db.redis_client.keys("meteo:*:B00300S")
-        redis_station_ids = set([k.split(":")[1] for k in all_meteo_keys])
-        print(f"[INFO] Stacje z danymi w Redis: {len(redis_station_ids)}")
-
-        # Znajdź stacje które są w MongoDB z tym województwem/powiatem i mają dane w Redis
-        stations_with_data = []
-        for redis_sid in redis_station_ids:
-            station = stations_collection.find_one({"station_id": redis_sid})
-            if station:
-                woj = station.get("wojewodztwo", "")
-                pow_name = station.get("powiat", "")
-                if admin_type == "powiat" and pow_name:
-                    if admin_id.lower() in pow_name.lower():
-                        stations_with_data.append(redis_sid)
-                elif admin_type == "wojewodztwo" and woj:
-                    if admin_id.lower() in woj.lower():
-                        stations_with_data.append(redis_sid)
-
+        # Stacje jednostki z cache Redis (zbiór z TTL), a przy braku - wyszukanie i zapis do cache
+        stations_with_data = sorted(db.get_cached_admin_stations(admin_type, admin_id))
+        if not stations_with_data:
+            # Najpierw pobierz wszystkie stacje z Redis które mają dane
+            redis_station_ids = db.get_series_station_ids("B00300S")
+            print(f"[INFO] Stacje z danymi w Redis: {len(redis_station_ids)}")
+
+            # Znajdź stacje które są w MongoDB z tym województwem/powiatem i mają dane w Redis:
+            # najpierw równość znormalizowanej nazwy (indeks), a bez wyników - fragment nazwy
+            stations_with_data = db.get_stations_by_admin_norm(admin_id, admin_type, redis_station_ids)
+            if not stations_with_data:
+                station_admin = self.get_station_admin_index(redis_station_ids)
+                needle = admin_id.lower()
+                field = 1 if admin_type == "powiat" else 0
+                stations_with_data = sorted(
+                    sid for sid in redis_station_ids
+                    if station_admin[sid][field] and needle in station_admin[sid][field]
+                )
+            db.cache_admin_stations(admin_type, admin_id, stations_with_data)
 
         if not stations_with_data:
             print(f"[WARNING] Brak stacji z danymi dla {admin_id}")
@@ -752,16 +1033,8 @@ class MeteoApp:
             print(f"[ERROR] Nieprawidłowy format daty: {date}")
             return results
 
-        # Oblicz wschód i zachód słońca (przybliżenie dla Polski - centrum)
-        try:
-            location = LocationInfo("Poland", "Poland", "Europe/Warsaw", 52.0, 19.0)
-            s = sun(location.observer, date=selected_date)
-            sunrise = s["sunrise"].replace(tzinfo=None)
-            sunset = s["sunset"].replace(tzinfo=None)
-        except:
-            # Domyślne wartości
-            sunrise = selected_date.replace(hour=6, minute=0)
-            sunset = selected_date.replace(hour=18, minute=0)
+        # Wschód i zachód słońca (przybliżenie dla Polski - centrum), liczone raz na datę
+        sunrise, sunset = sun_times(date)
 
         # Zakres czasowy dla dnia (timestamp w ms)
         day_start = int(selected_date.timestamp() * 1000)
@@ -769,55 +1042,41 @@ class MeteoApp:
 
         print(f"[INFO] Zakres dat: {selected_date.date()} ({day_start} - {day_end})")
 
+        # Nowsze żądanie w międzyczasie - bez pobierania danych, których nikt nie zobaczy
+        if is_stale is not None and is_stale():
+            return None
+
+        # Dane dnia dla każdego parametru - parametry pobierane równolegle, każdy własnym potokiem
+        with ThreadPoolExecutor(max_workers=min(len(param_mapping), FETCH_WORKERS)) as ex:
+            fetched = dict(zip(param_mapping, ex.map(
+                lambda code: self.fetch_param_values(code, stations_with_data, day_start, day_end),
+                param_mapping
+            )))
+
+        # Granice dnia w ms, porównywane bezpośrednio ze score (czas pomiaru)
+        sunrise_ms = sunrise.timestamp() * 1000
+        sunset_ms = sunset.timestamp() * 1000
+
         # Dla każdego parametru
         for param_code, result_key in param_mapping.items():
-            day_values = []
-            night_values = []
-            all_values = []
-
-            for station_id in stations_with_data:
-                key = f"meteo:{station_id}:{param_code}"
-
-                try:
-                    # Pobierz dane z Redis dla danego dnia
-                    data = db.redis_client.zrangebyscore(key, day_start, day_end, withscores=True)
-
-                    for item, score in data:
-                        try:
-                            # Format: "timestamp:value"
-                            parts = item.split(":")
-                            if len(parts) >= 2:
-                                value = float(parts[1])
-                                ts = datetime.fromtimestamp(score / 1000)
-
-                                all_values.append(value)
-
-                                # Podział na dzień/noc
-                                if sunrise <= ts <= sunset:
-                                    day_values.append(value)
-                                else:
-                                    night_values.append(value)
-                        except:
-                            continue
-                except Exception as e:
-                    continue
+            values, scores = fetched[param_code]
+            if not values.size:
+                continue
 
             # Oblicz statystyki
-            if result_key in ["opad_dobowy", "poryw"]:
+            if result_key in SINGLE_VALUE_RESULTS:
                 # Dla tych parametrów zwracamy tylko jedną wartość
-                if all_values:
-                    if result_key == "opad_dobowy":
-                        results[result_key] = sum(all_values) / len(stations_with_data) if stations_with_data else 0
-                    else:
-                        results[result_key] = max(all_values)
+                if result_key == "opad_dobowy":
+                    results[result_key] = float(values.sum()) / len(stations_with_data)
+                else:
+                    results[result_key] = float(values.max())
             else:
-                # Dla pozostałych - dzień/noc ze średnią i medianą
-                if day_values:
-                    results[result_key]["dzien"]["mean"] = float(np.mean(day_values))
-                    results[result_key]["dzien"]["median"] = float(np.median(day_values))
-                if night_values:
-                    results[result_key]["noc"]["mean"] = float(np.mean(night_values))
-                    results[result_key]["noc"]["median"] = float(np.median(night_values))
+                # Dla pozostałych - dzień/noc ze średnią i medianą (maska dnia dla całej tablicy)
+                day_mask = (scores >= sunrise_ms) & (scores <= sunset_ms)
+                for period, part in (("dzien", values[day_mask]), ("noc", values[~day_mask])):
+                    if part.size:
+                        results[result_key][period]["mean"] = float(part.mean())
+                        results[result_key][period]["median"] = float(np.median(part))
 
         print(f"[INFO] Obliczenia zakończone, temp_powietrza dzień: {results['temp_powietrza']['dzien']}")
         return results
@@ -829,77 +1088,20 @@ class MeteoApp:
                 return "-"
             return f"{val:.1f}"
 
-        # Temperatura powietrza
-        if "temp_powietrza" in results:
-            tp = results["temp_powietrza"]
-            self.t_pow_night_sr.config(text=format_val(tp.get("noc", {}).get("mean")))
-            self.t_pow_day_sr.config(text=format_val(tp.get("dzien", {}).get("mean")))
-            self.t_pow_night_med.config(text=format_val(tp.get("noc", {}).get("median")))
-            self.t_pow_day_med.config(text=format_val(tp.get("dzien", {}).get("median")))
-
-        # Temperatura gruntu
-        if "temp_gruntu" in results:
-            tg = results["temp_gruntu"]
-            self.t_grunt_night_sr.config(text=format_val(tg.get("noc", {}).get("mean")))
-            self.t_grunt_day_sr.config(text=format_val(tg.get("dzien", {}).get("mean")))
-            self.t_grunt_night_med.config(text=format_val(tg.get("noc", {}).get("median")))
-            self.t_grunt_day_med.config(text=format_val(tg.get("dzien", {}).get("median")))
-
-        # Wilgotność
-        if "wilgotnosc" in results:
-            w = results["wilgotnosc"]
-            self.wilg_night_sr.config(text=format_val(w.get("noc", {}).get("mean")))
-            self.wilg_day_sr.config(text=format_val(w.get("dzien", {}).get("mean")))
-            self.wilg_night_med.config(text=format_val(w.get("noc", {}).get("median")))
-            self.wilg_day_med.config(text=format_val(w.get("dzien", {}).get("median")))
+        for key, stats in self.stat_vars.items():
+            if key not in results:
+                continue
+            for stat, (night_var, day_var) in stats.items():
+                night_var.set(format_val(results[key].get("noc", {}).get(stat)))
+                day_var.set(format_val(results[key].get("dzien", {}).get(stat)))
 
         # Opad dobowy
         if "opad_dobowy" in results:
-            self.opad_dobowy_label.config(text=format_val(results["opad_dobowy"]))
-
-        # Opad godzinowy
-        if "opad_godzinowy" in results:
-            og = results["opad_godzinowy"]
-            self.opad_godz_night_sr.config(text=format_val(og.get("noc", {}).get("mean")))
-            self.opad_godz_day_sr.config(text=format_val(og.get("dzien", {}).get("mean")))
-            self.opad_godz_night_med.config(text=format_val(og.get("noc", {}).get("median")))
-            self.opad_godz_day_med.config(text=format_val(og.get("dzien", {}).get("median")))
-
-        # Opad 10-min
-        if "opad_10min" in results:
-            o10 = results["opad_10min"]
-            self.opad_10_night_sr.config(text=format_val(o10.get("noc", {}).get("mean")))
-            self.opad_10_day_sr.config(text=format_val(o10.get("dzien", {}).get("mean")))
-            self.opad_10_night_med.config(text=format_val(o10.get("noc", {}).get("median")))
-            self.opad_10_day_med.config(text=format_val(o10.get("dzien", {}).get("median")))
-
-        # Prędkość wiatru
-        if "predkosc_wiatru" in results:
-            pw = results["predkosc_wiatru"]
-            self.pred_wiatr_night_sr.config(text=format_val(pw.get("noc", {}).get("mean")))
-            self.pred_wiatr_day_sr.config(text=format_val(pw.get("dzien", {}).get("mean")))
-            self.pred_wiatr_night_med.config(text=format_val(pw.get("noc", {}).get("median")))
-            self.pred_wiatr_day_med.config(text=format_val(pw.get("dzien", {}).get("median")))
-
-        # Kierunek wiatru
-        if "kierunek_wiatru" in results:
-            kw = results["kierunek_wiatru"]
-            self.kier_wiatr_night_sr.config(text=format_val(kw.get("noc", {}).get("mean")))
-            self.kier_wiatr_day_sr.config(text=format_val(kw.get("dzien", {}).get("mean")))
-            self.kier_wiatr_night_med.config(text=format_val(kw.get("noc", {}).get("median")))
-            self.kier_wiatr_day_med.config(text=format_val(kw.get("dzien", {}).get("median")))
-
-        # Maks prędkość
-        if "maks_predkosc" in results:
-            mp = results["maks_predkosc"]
-            self.maks_pred_night_sr.config(text=format_val(mp.get("noc", {}).get("mean")))
-            self.maks_pred_day_sr.config(text=format_val(mp.get("dzien", {}).get("mean")))
-            self.maks_pred_night_med.config(text=format_val(mp.get("noc", {}).get("median")))
-            self.maks_pred_day_med.config(text=format_val(mp.get("dzien", {}).get("median")))
+            self.opad_dobowy_var.set(format_val(results["opad_dobowy"]))
 
         # Poryw
         if "poryw" in results:
-            self.poryw_label.config(text=format_val(results["poryw"]))
+            self.poryw_var.set(format_val(results["poryw"]))
 
 
     def clear_cache(self):
@@ -907,13 +1109,15 @@ class MeteoApp:
         try:
             if db.redis_client is not None:
                 # Usuń tylko klucze cache (meteo_stats, admin_list), NIE dane pomiarowe (meteo:*)
-                cache_keys = db.redis_client.keys("meteo_stats:*")
-                cache_keys += db.redis_client.keys("admin_list:*")
-                cache_keys += db.redis_client.keys("query_counter:*")
+                removed = db.cache_delete_matching(["meteo_stats:*", "admin_list:*", "query_counter:*"])
+
+                # Przypisanie stacji do jednostek zostanie pobrane ponownie
+                self._station_admin = None
+                with self._results_memo_lock:
+                    self._results_memo.clear()
 
-                if cache_keys:
-                    db.redis_client.delete(*cache_keys)
-                    messagebox.showinfo("Sukces", f"Wyczyszczono {len(cache_keys)} kluczy cache")
+                if removed:
+                    messagebox.showinfo("Sukces", f"Wyczyszczono {removed} kluczy cache")
                 else:
                     messagebox.showinfo("Info", "Cache jest pusty")
                 self.set_status("Cache wyczyszczony")
@@ -0,0 +1,23 @@
+import pandas as pd
+
+import app1
+from app1 import aggregate_by_admin
+
+
+def test_aggregate_by_admin_keeps_integer_ids(monkeypatch):
+    monkeypatch.setattr(app1, "save_output", lambda df, name: None)
+    station_admin = pd.DataFrame({"KodSH": ["100", "200"], "id": pd.array([186, 187], dtype="int64")})
+    stats = pd.DataFrame({
+        "KodSH": ["100", "200", "300"],
+        "date": pd.to_datetime(["2024-06-01"] * 3),
+        "period": ["dzien"] * 3,
+        "mean": [1.0, 2.0, 3.0],
+        "median": [1.0, 2.0, 3.0],
+        "trimmed_mean": [1.0, 2.0, 3.0],
+        "count": [1, 1, 1],
+    })
+
+    agg = aggregate_by_admin(stats, station_admin, "id", "test")
+
+    assert agg["id"].dtype == "int64"
+    assert agg["id"].tolist() == [186, 187]
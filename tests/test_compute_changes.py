@@ -0,0 +1,28 @@
+import pandas as pd
+
+from app1 import compute_changes
+
+
+def test_compute_changes_empty_input():
+    df = pd.DataFrame(columns=["id", "date", "period", "mean", "median", "trimmed_mean", "count"])
+
+    res = compute_changes(df, "id")
+
+    assert res.empty
+    assert list(res.columns) == ["id", "period", "date", "mean", "median", "mean_change", "median_change"]
+
+
+def test_compute_changes_adjacent_windows():
+    df = pd.DataFrame({
+        "id": [1, 1, 1],
+        "date": pd.to_datetime(["2024-06-01", "2024-06-08", "2024-06-15"]),
+        "period": ["dzien", "dzien", "dzien"],
+        "mean": [10.0, 12.0, 15.0],
+        "median": [10.0, 11.0, 11.0],
+    })
+
+    res = compute_changes(df, "id")
+
+    assert res["mean_change"].isna().iloc[0]
+    assert res["mean_change"].iloc[1:].tolist() == [2.0, 3.0]
+    assert res["median_change"].iloc[1:].tolist() == [1.0, 0.0]
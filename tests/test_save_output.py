@@ -0,0 +1,19 @@
+import pandas as pd
+
+import app1
+from app1 import save_output
+
+
+def test_save_output_csv_matches_to_csv(tmp_path, monkeypatch):
+    monkeypatch.setattr(app1, "OUTPUT_DIR", str(tmp_path))
+    monkeypatch.setattr(app1, "OUTPUT_FORMAT", "csv")
+    df = pd.DataFrame({
+        "id": [186, 187],
+        "date": pd.to_datetime(["2024-06-01", "2024-06-08"]),
+        "period": ["dzien", "noc"],
+        "mean": [1.5, 2.25],
+    })
+
+    save_output(df, "out")
+
+    assert (tmp_path / "out.csv").read_text() == df.to_csv(index=False)